@@ -15,23 +15,57 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 
+# Taken before anything heavy is imported, so the reported startup
+# latency covers module loading too.
+import time
+_START_TIME = time.monotonic()
+
 import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk
-import time
 from gi.repository import GLib
 from sugar3.activity import activity
+from sugar3.activity.activity import PREVIEW_SIZE
 from sugar3.graphics.toolbarbox import ToolbarBox
 from sugar3.activity.widgets import ActivityToolbarButton
 from sugar3.activity.widgets import StopButton
 from sugar3.graphics.toolbutton import ToolButton
+from sugar3.graphics.toggletoolbutton import ToggleToolButton
 from gettext import gettext as _
 import os
+import io
 import json
-from collabwrapper import CollabWrapper
+import logging
 
-from game import Game, GameMode
 from game import Game
+from styles import get_provider
+
+_logger = logging.getLogger('Euclids')
+
+# Collaboration is set up after the first frame; this is only a fallback
+# in case the window is never painted.
+COLLAB_SETUP_TIMEOUT = 1000
+
+HELP_DIALOG_CSS = b"""
+window {
+    background-color: #ffffff;
+    border: 3px solid #4A90E2;
+    border-radius: 12px;
+}
+label {
+    color: #333333;
+}
+button {
+    border-radius: 20px;
+}
+button:hover {
+    background-color: rgba(74, 144, 226, 0.1);
+}
+scrolledwindow {
+    border: 1px solid #e0e0e0;
+    border-radius: 6px;
+}
+"""
 
 class Euclids(activity.Activity):
     def __init__(self, handle):
@@ -39,18 +73,25 @@ class Euclids(activity.Activity):
         
         self._loaded_from_journal = False
         self._read_file_called = False
+        self._collab = None
+        self._profiler = None
+        self._archive_opened = False
+        self._checkpoints_resumed = False
+        self._first_frame_id = None
+        self.startup_latency = None
+        # Seconds taken by the last write_file, serializing included
+        self.write_latency = None
         
         self._create_toolbar()
         
-        self.game = Game()
-        
-        self._collab = CollabWrapper(self)
-        self._collab.connect('joined', self.__joined_cb)
-        self._collab.connect('buddy_joined', self.__buddy_joined_cb)
-        self._collab.connect('buddy_left', self.__buddy_left_cb)
-        self._collab.connect('message', self.__message_cb)
+        # The game starts on its menu; the game screen is only built
+        # when a game is started or resumed from the journal.
+        self.game = Game(standalone=False)
         
-        self.game.set_collab_wrapper(self._collab)
+        data_dir = os.path.join(self.get_activity_root(), 'data')
+        self._data_dir = data_dir
+        # Before the first frame, so that the startup work is profiled
+        self._profile_from_launch()
         
         game_content = self.game.main_box
         if game_content.get_parent():
@@ -58,25 +99,71 @@ class Euclids(activity.Activity):
         
         self.set_canvas(game_content)
         
-        self.game.hide()
-        
-        GLib.timeout_add(500, self._setup_collab)
+        if self.get_realized():
+            self.__realize_cb(self)
+        else:
+            self.connect('realize', self.__realize_cb)
+        GLib.timeout_add(COLLAB_SETUP_TIMEOUT, self._setup_collab)
+        GLib.timeout_add(COLLAB_SETUP_TIMEOUT, self._open_archive)
+        GLib.timeout_add(COLLAB_SETUP_TIMEOUT, self._resume_checkpoints)
+    
+    def __realize_cb(self, widget):
+        clock = self.get_frame_clock()
+        if clock is not None and self._first_frame_id is None:
+            self._first_frame_id = clock.connect('after-paint',
+                                                 self.__first_frame_cb)
+    
+    def __first_frame_cb(self, clock):
+        clock.disconnect(self._first_frame_id)
+        self.startup_latency = time.monotonic() - _START_TIME
+        _logger.info('Time to first frame: %.0f ms',
+                     self.startup_latency * 1000)
+        self._resume_checkpoints()
+        GLib.idle_add(self._setup_collab, priority=GLib.PRIORITY_LOW)
+        GLib.idle_add(self._open_archive, priority=GLib.PRIORITY_LOW)
+    
+    def _open_archive(self):
+        """Open the games archive once the first frame is on screen"""
+        if self._archive_opened:
+            return False
+        self._archive_opened = True
         
-        GLib.timeout_add(100, self._check_and_show_menu)
+        # sqlite3 and the schema setup stay off the path to the first
+        # frame; a game finished before this is simply not archived.
+        from archive import GameArchive
+        try:
+            self.game.archive = GameArchive(
+                os.path.join(self._data_dir, 'games.sqlite'))
+        except Exception as e:
+            _logger.error('Game archive unavailable: %s', e)
+        return False
+    
+    def _profile_from_launch(self):
+        """Start profiling before the first frame if PROFILE_ENV is set"""
+        from profiling import PROFILE_ENV
+        if os.environ.get(PROFILE_ENV):
+            self._profile_button.set_active(True)
     
     def _setup_collab(self):
-        """Setup collaboration after everything is initialized"""
+        """Setup collaboration once the first frame is on screen"""
+        if self._collab is not None:
+            return False
+        
+        # Importing the collaboration stack pulls in Telepathy and D-Bus,
+        # which is kept off the path to the first frame.
+        from collabwrapper import CollabWrapper
+        from codec import GAME_CODEC
+        
+        self._collab = CollabWrapper(self, codec=GAME_CODEC)
+        self._collab.connect('joined', self.__joined_cb)
+        self._collab.connect('buddy_joined', self.__buddy_joined_cb)
+        self._collab.connect('buddy_left', self.__buddy_left_cb)
+        self._collab.connect('message', self.__message_cb)
+        
+        self.game.set_collab_wrapper(self._collab)
         self._collab.setup()
         return False
     
-    def _check_and_show_menu(self):
-        """Show menu only if we haven't loaded from journal"""
-        if not self._read_file_called:
-            self.game.show_menu()
-        else:
-            print("DEBUG: Journal file is being loaded, not showing menu")
-        return False 
-    
     def _create_toolbar(self):
         toolbar_box = ToolbarBox()
         self.set_toolbar_box(toolbar_box)
@@ -94,6 +181,14 @@ class Euclids(activity.Activity):
         help_button.connect("clicked", self._show_help)
         toolbar_box.toolbar.insert(help_button, -1)
         
+        # Hidden until Ctrl+Shift+P, for collecting profiles in class
+        self._profile_button = ToggleToolButton('computer-xo')
+        self._profile_button.set_tooltip(_('Profile'))
+        self._profile_button.set_no_show_all(True)
+        self._profile_button.connect('toggled', self._profile_toggled_cb)
+        toolbar_box.toolbar.insert(self._profile_button, -1)
+        self.connect('key-press-event', self.__key_press_cb)
+        
         separator = Gtk.SeparatorToolItem()
         separator.props.draw = False
         separator.set_expand(True)
@@ -107,6 +202,32 @@ class Euclids(activity.Activity):
     def _show_menu(self, button):
         self.game.show_menu()
     
+    def __key_press_cb(self, widget, event):
+        mask = Gdk.ModifierType.CONTROL_MASK | Gdk.ModifierType.SHIFT_MASK
+        if (event.get_state() & mask == mask and
+                Gdk.keyval_to_lower(event.keyval) == Gdk.KEY_p):
+            self._profile_button.set_visible(
+                not self._profile_button.get_visible())
+            return True
+        return False
+    
+    def _profile_toggled_cb(self, button):
+        if button.get_active():
+            if self._profiler is None:
+                from profiling import SessionProfiler
+                self._profiler = SessionProfiler(self.game, self._data_dir)
+            self._profiler.start()
+            _logger.info('Profiling started')
+        else:
+            self._stop_profiling()
+    
+    def _stop_profiling(self):
+        if self._profiler is None:
+            return
+        paths = self._profiler.stop()
+        if paths:
+            _logger.info('Profile written to %s', paths[1])
+    
     def _show_help(self, button):
         """Show the help dialog when help button is clicked."""
         help_message = """About Euclid's Game:
@@ -201,29 +322,7 @@ Game Modes:
             main_vbox.pack_start(scrolled, True, True, 0)
             
             try:
-                css_provider = Gtk.CssProvider()
-                css_data = """
-                window {
-                    background-color: #ffffff;
-                    border: 3px solid #4A90E2;
-                    border-radius: 12px;
-                }
-                label {
-                    color: #333333;
-                }
-                button {
-                    border-radius: 20px;
-                }
-                button:hover {
-                    background-color: rgba(74, 144, 226, 0.1);
-                }
-                scrolledwindow {
-                    border: 1px solid #e0e0e0;
-                    border-radius: 6px;
-                }
-                """.encode('utf-8')
-                
-                css_provider.load_from_data(css_data)
+                css_provider = get_provider(HELP_DIALOG_CSS)
                 style_context = dialog.get_style_context()
                 style_context.add_provider(css_provider, Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION)
             except Exception as css_error:
@@ -306,48 +405,74 @@ Game Modes:
             traceback.print_exc()
             self.game.show_menu()
 
+    def _resume_checkpoints(self):
+        """Replay the moves logged since the journal was last written
+        
+        Runs once the first frame is on screen, after read_file if the
+        journal had a file, and then starts logging the moves of this
+        session.
+        """
+        if self._checkpoints_resumed:
+            return False
+        self._checkpoints_resumed = True
+        
+        from checkpoint import CheckpointLog, read_log
+        # Moves are logged here between journal writes; what a crash left
+        # behind is read before anything truncates it.
+        path = os.path.join(self._data_dir, 'checkpoints', f'{self.get_id()}.log')
+        tail = None if self.shared_activity else read_log(path)
+        self.game.checkpoints = CheckpointLog(path)
+        try:
+            self.game.resume_checkpoints(tail)
+        except Exception as e:
+            _logger.error('Could not replay the checkpoint log: %s', e)
+        return False
+
     def write_file(self, file_path):
         """Save game state to Journal"""
+        from journal import serialize, write_atomic
         
+        start = time.perf_counter()
+        data = {
+            'metadata': {
+                'activity': 'org.sugarlabs.Euclids',
+                'activity_version': 1,
+                'mime_type': 'application/x-euclids-game',
+                'timestamp': time.time()
+            },
+            'game_state': self.game.save_state()
+        }
         try:
-            data = {
-                'metadata': {
-                    'activity': 'org.sugarlabs.Euclids',
-                    'activity_version': 1,
-                    'mime_type': 'application/x-euclids-game',
-                    'timestamp': time.time()
-                },
-                'game_state': {}
-            }
-            
-            if hasattr(self.game, 'save_state'):
-                game_state = self.game.save_state()
-                data['game_state'] = game_state
-            else:
-                print("ERROR: game object doesn't have save_state method")
-            
-            try:
-                json_string = json.dumps(data, indent=2)
-            except Exception as e:
-                print(f"ERROR: JSON serialization failed: {e}")
-                return
-            
-            with open(file_path, 'w') as f:
-                f.write(json_string)
-                f.flush()
-                os.fsync(f.fileno())
-            if os.path.exists(file_path):
-                file_size = os.path.getsize(file_path)
-                
-                with open(file_path, 'r') as f:
-                    verify_content = f.read()
-            else:
-                print("ERROR: File doesn't exist after writing!")
-                
-        except Exception as e:
-            print(f"ERROR: Writing file failed: {e}")
-            import traceback
-            traceback.print_exc()
+            payload = serialize(data)
+        except (TypeError, ValueError) as e:
+            _logger.error('Could not serialize the game: %s', e)
+            return
+        serialize_time = time.perf_counter() - start
+        
+        # The datastore takes the file as soon as this returns, so it is
+        # written right here; the main loop is not run meanwhile.
+        written = time.perf_counter()
+        try:
+            write_atomic(file_path, payload)
+        except OSError as e:
+            _logger.error('Writing %s failed: %s', file_path, e)
+            return
+        write_time = time.perf_counter() - written
+        self.write_latency = serialize_time + write_time
+        _logger.info('Journal write: %d bytes, serialized in %.1f ms, '
+                     'written in %.1f ms', len(payload),
+                     serialize_time * 1000, write_time * 1000)
+
+    def get_preview(self):
+        """Render the board straight to an in-memory PNG for the Journal"""
+        board = getattr(self.game, 'board', None)
+        if board is None or not self.game.active_numbers:
+            return activity.Activity.get_preview(self)
+        
+        surface = board.render_preview(*PREVIEW_SIZE)
+        preview = io.BytesIO()
+        surface.write_to_png(preview)
+        return preview.getvalue()
 
     def can_close(self):
         """Called when the activity is about to close"""
@@ -355,9 +480,25 @@ Game Modes:
 
     def close(self):
         """Clean shutdown"""
+        self._stop_profiling()
+        stats = self._collab.stats if self._collab is not None else None
+        if stats and stats['sent'] + stats['received']:
+            _logger.info('Collaboration: sent %d messages, %d bytes, '
+                         'encoded in %.1f ms; received %d messages, %d bytes, '
+                         'decoded in %.1f ms', stats['sent'],
+                         stats['sent_bytes'], stats['encode_time'] * 1000,
+                         stats['received'], stats['received_bytes'],
+                         stats['decode_time'] * 1000)
         if hasattr(self.game, 'quit'):
             self.game.quit()
+        # Saves through write_file; everything it may use stays open
         super(Euclids, self).close()
+        if self.game.archive is not None:
+            self.game.archive.close()
+            self.game.archive = None
+        if self.game.checkpoints is not None:
+            self.game.checkpoints.close()
+            self.game.checkpoints = None
     
     def __joined_cb(self, collab):
         """Called when we join a shared activity"""
@@ -0,0 +1,233 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Aggregate statistics over archived games.
+
+Reads journal entries written by the activity (the `game_state` of
+`Game.save_state`) and replay archives (see replay.py), one game at a
+time, and prints a JSON summary::
+
+    python3 analytics.py ~/journal-exports games.eucr --jobs 4
+
+Directories are searched recursively.  Only the running totals are kept
+in memory, so any number of games can be processed; with --jobs the
+files, and large archives in slices, are spread over a process pool
+and the partial totals merged.
+'''
+
+import argparse
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+from positions import board_gcd
+from replay import MAGIC, ReplayError, ReplayReader, from_state, simulate
+from rules import DEFAULT_RULE
+
+# GameMode.VS_BOT in game.py; the bot is always player 2
+VS_BOT = 1
+BOT_PLAYER = 2
+
+# Games of a replay archive handed to one worker at a time
+ARCHIVE_SLICE = 2000
+
+
+def _is_archive(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def iter_tasks(paths):
+    '''Yield (path, start, stop) units of work; start is None for JSON.'''
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                yield from iter_tasks(os.path.join(root, name)
+                                      for name in sorted(files))
+            continue
+        try:
+            if not _is_archive(path):
+                yield (path, None, None)
+                continue
+            with ReplayReader(path) as reader:
+                count = len(reader)
+        except (OSError, ReplayError) as e:
+            print(f"WARNING: Skipping {path}: {e}", file=sys.stderr)
+            continue
+        for start in range(0, count, ARCHIVE_SLICE):
+            yield (path, start, min(count, start + ARCHIVE_SLICE))
+
+
+def iter_games(task):
+    '''Yield the ReplayGame objects of one unit of work.'''
+    path, start, stop = task
+    if start is None:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError, UnicodeDecodeError):
+            return
+        if isinstance(data, dict):
+            state = data.get('game_state', data)
+            # The closed forms below only hold for the difference rule
+            if (state.get('active_numbers') and
+                    state.get('rule', DEFAULT_RULE) == DEFAULT_RULE):
+                yield from_state(state)
+        return
+
+    with ReplayReader(path) as reader:
+        for index in range(start, stop):
+            yield reader.game(index)
+
+
+class Summary:
+    '''Running totals that can be merged across workers.'''
+
+    def __init__(self):
+        self.games = 0
+        self.finished = 0
+        self.invalid = 0
+        self.moves = 0
+        self.first_player_wins = 0
+        self.by_gcd = {}
+        self.bot_moves = 0
+        self.bot_games = 0
+        self.bot_wins = 0
+
+    def add(self, game, validate=False):
+        if not game.numbers:
+            return
+        if validate:
+            try:
+                for _ in simulate(game):
+                    pass
+            except ReplayError:
+                self.invalid += 1
+                return
+
+        self.games += 1
+        moves = len(game.diffs)
+        self.moves += moves
+
+        # Every multiple of the gcd up to the maximum ends up on the
+        # board, so the number of moves left before move i is known
+        # without replaying: total - i.
+        gcd = board_gcd(game.numbers)
+        total = max(game.numbers) // gcd - len(game.numbers)
+
+        if game.mode == VS_BOT:
+            self.bot_moves += moves // 2
+
+        if moves == total:
+            self.finished += 1
+            winner = game.winner or (moves - 1) % 2 + 1
+            if winner == 1:
+                self.first_player_wins += 1
+            games, length = self.by_gcd.get(gcd, (0, 0))
+            self.by_gcd[gcd] = (games + 1, length + moves)
+            if game.mode == VS_BOT:
+                self.bot_games += 1
+                if winner == BOT_PLAYER:
+                    self.bot_wins += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.finished += other.finished
+        self.invalid += other.invalid
+        self.moves += other.moves
+        self.first_player_wins += other.first_player_wins
+        for gcd, (games, length) in other.by_gcd.items():
+            total_games, total_length = self.by_gcd.get(gcd, (0, 0))
+            self.by_gcd[gcd] = (total_games + games, total_length + length)
+        self.bot_moves += other.bot_moves
+        self.bot_games += other.bot_games
+        self.bot_wins += other.bot_wins
+
+    def report(self):
+        def rate(count, total):
+            return count / total if total else None
+
+        return {
+            'games': self.games,
+            'finished': self.finished,
+            'invalid': self.invalid,
+            'moves': self.moves,
+            'first_player_win_rate': rate(self.first_player_wins,
+                                          self.finished),
+            'average_length_by_gcd': {
+                str(gcd): {'games': games, 'average_length': length / games}
+                for gcd, (games, length) in sorted(self.by_gcd.items())
+            },
+            'bot_moves': self.bot_moves,
+            'bot_games': self.bot_games,
+            'bot_win_rate': rate(self.bot_wins, self.bot_games),
+        }
+
+
+def summarize_task(task, validate=False):
+    summary = Summary()
+    for game in iter_games(task):
+        summary.add(game, validate)
+    return summary
+
+
+def _summarize_validated(task):
+    return summarize_task(task, validate=True)
+
+
+def analyse(paths, jobs=1, validate=False):
+    '''Return a Summary of every game found under paths.'''
+    summary = Summary()
+    tasks = iter_tasks(paths)
+    worker = _summarize_validated if validate else summarize_task
+
+    if jobs <= 1:
+        for task in tasks:
+            summary.merge(worker(task))
+        return summary
+
+    with Pool(jobs) as pool:
+        for partial in pool.imap_unordered(worker, tasks):
+            summary.merge(partial)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+',
+                        help='journal entries, replay archives or directories')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='worker processes (default: 1)')
+    parser.add_argument('--validate', action='store_true',
+                        help='replay every move and skip illegal games')
+    parser.add_argument('--output', help='write the JSON summary here')
+    args = parser.parse_args(argv)
+
+    report = analyse(args.paths, args.jobs, args.validate).report()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Local archive of finished games in SQLite.
+
+Games are queued by record() and written by a background thread, many
+per transaction, so the UI never waits on the disk.  Queries use their
+own connection; the database is in WAL mode so they are not blocked by
+the writer.  Look at an archive from the command line::
+
+    python3 archive.py ~/.sugar/default/org.sugarlabs.Euclids/data/games.sqlite
+'''
+
+import argparse
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+_logger = logging.getLogger('Euclids')
+
+# Most games written in one transaction, and the longest a queued game
+# waits for others to join its transaction, in seconds
+BATCH_SIZE = 64
+FLUSH_INTERVAL = 2.0
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    mode INTEGER NOT NULL,
+    difficulty INTEGER,
+    rule TEXT NOT NULL,
+    player1 TEXT NOT NULL,
+    player2 TEXT NOT NULL,
+    winner INTEGER,
+    opening TEXT NOT NULL,
+    start_gcd INTEGER NOT NULL,
+    moves TEXT NOT NULL,
+    move_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_player1 ON games (player1);
+CREATE INDEX IF NOT EXISTS games_player2 ON games (player2);
+CREATE INDEX IF NOT EXISTS games_finished_at ON games (finished_at);
+CREATE INDEX IF NOT EXISTS games_start_gcd ON games (start_gcd);
+'''
+
+COLUMNS = ('started_at', 'finished_at', 'duration', 'mode', 'difficulty',
+           'rule', 'player1', 'player2', 'winner', 'opening', 'start_gcd',
+           'moves', 'move_count')
+
+INSERT = (f"INSERT INTO games ({', '.join(COLUMNS)}) "
+          f"VALUES ({', '.join('?' * len(COLUMNS))})")
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=10)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA journal_mode=WAL')
+    # WAL stays consistent with NORMAL; a crash may lose the last batch
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+class GameArchive:
+    '''A games database with a background writer.'''
+
+    def __init__(self, path):
+        self.path = path
+        connection = _connect(path)
+        with connection:
+            connection.executescript(SCHEMA)
+        self._reader = connection
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop,
+                                        name='GameArchive', daemon=True)
+        self._thread.start()
+
+    def record(self, started_at, finished_at, mode, difficulty, rule,
+               player1, player2, winner, opening, start_gcd, moves):
+        '''Queue a finished game for writing; returns immediately.'''
+        self._queue.put((started_at, finished_at, finished_at - started_at,
+                         mode, difficulty, rule, player1, player2, winner,
+                         json.dumps(list(opening)), start_gcd,
+                         json.dumps(list(moves)), len(moves)))
+
+    def flush(self):
+        '''Wait until every queued game is written.'''
+        self._queue.join()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._reader.close()
+
+    def _write_loop(self):
+        connection = _connect(self.path)
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while item is not None and len(batch) < BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            rows = [row for row in batch if row is not None]
+            if rows:
+                try:
+                    with connection:
+                        connection.executemany(INSERT, rows)
+                except sqlite3.Error as e:
+                    _logger.error('Could not archive %d games: %s',
+                                  len(rows), e)
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                connection.close()
+                return
+
+    def _query(self, sql, args=()):
+        return [dict(row) for row in self._reader.execute(sql, args)]
+
+    def count(self):
+        return self._reader.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+    def iter_games(self):
+        '''Every game, oldest first, read as it is iterated.'''
+        for row in self._reader.execute('SELECT * FROM games ORDER BY id'):
+            yield dict(row)
+
+    def recent(self, limit=20):
+        '''The most recently finished games.'''
+        return self._query('SELECT * FROM games ORDER BY finished_at DESC '
+                           'LIMIT ?', (limit,))
+
+    def games_for_player(self, player, limit=100):
+        '''Games player took part in, newest first.'''
+        return self._query('SELECT * FROM games WHERE player1 = ? '
+                           'UNION ALL '
+                           'SELECT * FROM games WHERE player2 = ? AND player1 != ? '
+                           'ORDER BY finished_at DESC LIMIT ?',
+                           (player, player, player, limit))
+
+    def games_between(self, start, end):
+        '''Games finished between two time.time() values.'''
+        return self._query('SELECT * FROM games WHERE finished_at >= ? AND '
+                           'finished_at < ? ORDER BY finished_at',
+                           (start, end))
+
+    def player_stats(self, player):
+        '''Games, wins and average length for one player.'''
+        row = self._reader.execute(
+            'SELECT COUNT(*), SUM(won), AVG(move_count) FROM ('
+            ' SELECT winner = 1 AS won, move_count FROM games WHERE player1 = ?'
+            ' UNION ALL'
+            ' SELECT winner = 2 AS won, move_count FROM games'
+            ' WHERE player2 = ? AND player1 != ?)',
+            (player, player, player)).fetchone()
+        return {'games': row[0], 'wins': row[1] or 0,
+                'average_length': row[2]}
+
+    def stats_by_gcd(self):
+        '''Games, first player wins and average length per starting gcd.'''
+        return self._query('SELECT start_gcd, COUNT(*) AS games, '
+                           'SUM(winner = 1) AS first_player_wins, '
+                           'AVG(move_count) AS average_length '
+                           'FROM games GROUP BY start_gcd ORDER BY start_gcd')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('database')
+    parser.add_argument('--player', help='show the games of this player')
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    archive = GameArchive(args.database)
+    try:
+        print(f"{archive.count()} games")
+        if args.player:
+            print(json.dumps(archive.player_stats(args.player)))
+            games = archive.games_for_player(args.player, args.limit)
+        else:
+            for row in archive.stats_by_gcd():
+                print(json.dumps(row))
+            games = archive.recent(args.limit)
+        for game in games:
+            print(f"{time.ctime(game['finished_at'])}  {game['player1']} vs "
+                  f"{game['player2']}  winner {game['winner']}  "
+                  f"{game['move_count']} moves  {game['rule']}")
+    finally:
+        archive.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, Gdk, GObject
+import cairo
+from bisect import bisect_left
+import math
+
+BACKGROUND_COLOR = (1.0, 1.0, 1.0)
+ACTIVE_COLOR = (0x4C / 255, 0xAF / 255, 0x50 / 255)
+SELECTED_COLOR = (0x21 / 255, 0x96 / 255, 0xF3 / 255)
+HIGHLIGHT_COLOR = (0xFF / 255, 0x98 / 255, 0x00 / 255)
+WINNING_HINT_COLOR = (0x1B / 255, 0x5E / 255, 0x20 / 255)
+LOSING_HINT_COLOR = (0xD3 / 255, 0x2F / 255, 0x2F / 255)
+TEXT_COLOR = (1.0, 1.0, 1.0)
+
+BASE_FONT_SIZE = 18
+BASE_CELL_WIDTH = 50
+BASE_CELL_HEIGHT = 40
+CELL_MARGIN = 2
+CELL_RADIUS = 6
+HINT_LINE_WIDTH = 3
+INSENSITIVE_ALPHA = 0.6
+
+MIN_PREVIEW_SCALE = 0.2
+
+MIN_ZOOM = 0.5
+MAX_ZOOM = 3.0
+ZOOM_STEP = 1.25
+
+
+class BoardView(Gtk.Box):
+    """Number board painted with cairo on a single drawing area.
+
+    Numbers are laid out in a grid that wraps to the widget width.  Only
+    the cells intersecting the exposed region are painted, changes to
+    the numbers or the selection invalidate just the affected cells, and
+    clicks are resolved by hit-testing the grid.  Ctrl+scroll and
+    Ctrl+plus/minus/0 zoom the board.
+
+    set_hints() outlines numbers as winning or losing moves; the hint
+    function is only called for the cells being painted.
+    """
+
+    number_clicked = GObject.Signal('number-clicked', arg_types=[int])
+
+    def __init__(self):
+        super().__init__(orientation=Gtk.Orientation.HORIZONTAL)
+
+        self._numbers = []
+        self._selected = set()
+        self._highlight = None
+        self._hint = None
+        self._interactive = True
+        self._zoom = 1.0
+        self._digits = 0
+        self._columns = 1
+        self._cell_width = BASE_CELL_WIDTH
+        self._cell_height = BASE_CELL_HEIGHT
+
+        self._area = Gtk.DrawingArea()
+        self._area.set_can_focus(True)
+        self._area.set_hexpand(True)
+        self._area.set_vexpand(True)
+        self._area.add_events(
+            Gdk.EventMask.BUTTON_PRESS_MASK |
+            Gdk.EventMask.SCROLL_MASK |
+            Gdk.EventMask.SMOOTH_SCROLL_MASK |
+            Gdk.EventMask.KEY_PRESS_MASK
+        )
+        self._area.connect("draw", self._draw_cb)
+        self._area.connect("size-allocate", self._size_allocate_cb)
+        self._area.connect("button-press-event", self._button_press_cb)
+        self._area.connect("scroll-event", self._scroll_cb)
+        self._area.connect("key-press-event", self._key_press_cb)
+        self.pack_start(self._area, True, True, 0)
+
+        self._adjustment = Gtk.Adjustment()
+        self._adjustment.connect("value-changed", self._scrolled_cb)
+        scrollbar = Gtk.Scrollbar(orientation=Gtk.Orientation.VERTICAL,
+                                  adjustment=self._adjustment)
+        self.pack_start(scrollbar, False, False, 0)
+
+        self._update_metrics()
+
+    def set_numbers(self, numbers):
+        """Show the given numbers, repainting only the cells that moved"""
+        numbers = sorted(numbers)
+        if numbers == self._numbers:
+            return
+
+        first_changed = 0
+        for old, new in zip(self._numbers, numbers):
+            if old != new:
+                break
+            first_changed += 1
+
+        self._numbers = numbers
+        if self._update_metrics():
+            self._area.queue_draw()
+        else:
+            self._queue_from(first_changed)
+
+    def set_selection(self, selected):
+        selected = set(selected)
+        changed = self._selected ^ selected
+        self._selected = selected
+        for number in changed:
+            self._queue_number(number)
+
+    def set_highlight(self, number):
+        """Mark one number, eg. the candidate of a keyboard lookup"""
+        if number == self._highlight:
+            return
+        if self._highlight is not None:
+            self._queue_number(self._highlight)
+        self._highlight = number
+        if number is not None:
+            self._queue_number(number)
+
+    def set_hints(self, hint):
+        """Outline numbers by hint(number): True wins, False loses, None
+        is left alone.  Pass None to turn the outlines off."""
+        if hint is None and self._hint is None:
+            return
+        self._hint = hint
+        self._area.queue_draw()
+
+    def scroll_to(self, number):
+        """Scroll the board so that number is visible"""
+        index = bisect_left(self._numbers, number)
+        if index >= len(self._numbers) or self._numbers[index] != number:
+            return
+        top = (index // self._columns) * self._cell_height
+        value = self._adjustment.get_value()
+        page = self._adjustment.get_page_size()
+        if top < value:
+            self._set_scroll(top)
+        elif top + self._cell_height > value + page:
+            self._set_scroll(top + self._cell_height - page)
+
+    def grab_focus(self):
+        self._area.grab_focus()
+
+    def is_interactive(self):
+        return self._interactive
+
+    def set_interactive(self, interactive):
+        """Enable or disable clicks; a disabled board is drawn faded"""
+        if interactive != self._interactive:
+            self._interactive = interactive
+            self._area.queue_draw()
+
+    def set_zoom(self, zoom):
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+        if zoom == self._zoom:
+            return
+
+        # Keep the first visible row anchored while the grid reflows.
+        top_index = self._index_at(0, 0)
+        self._zoom = zoom
+        self._update_metrics()
+        if top_index is not None:
+            row = top_index // self._columns
+            self._set_scroll(row * self._cell_height)
+        self._area.queue_draw()
+
+    def get_zoom(self):
+        return self._zoom
+
+    def number_at(self, x, y):
+        """Return the number drawn at widget coordinates x, y, or None"""
+        index = self._index_at(x, y)
+        if index is None:
+            return None
+        return self._numbers[index]
+
+    def _index_at(self, x, y):
+        if x < 0 or y < 0:
+            return None
+        col = int(x // self._cell_width)
+        if col >= self._columns:
+            return None
+        row = int((y + self._adjustment.get_value()) // self._cell_height)
+        index = row * self._columns + col
+        if index >= len(self._numbers):
+            return None
+        return index
+
+    def _cell_rect(self, index):
+        row, col = divmod(index, self._columns)
+        x = col * self._cell_width
+        y = row * self._cell_height - int(self._adjustment.get_value())
+        return x, y, self._cell_width, self._cell_height
+
+    def _update_metrics(self):
+        """Recompute the grid geometry; return True if cells moved"""
+        old_geometry = (self._columns, self._cell_width, self._cell_height)
+
+        self._digits = len(str(self._numbers[-1])) if self._numbers else 2
+        base_width, base_height = self._base_cell_size()
+        self._cell_width = int(base_width * self._zoom) + 2 * CELL_MARGIN
+        self._cell_height = int(base_height * self._zoom) + 2 * CELL_MARGIN
+
+        width = self._area.get_allocated_width()
+        height = self._area.get_allocated_height()
+        self._columns = max(1, width // self._cell_width)
+
+        rows = math.ceil(len(self._numbers) / self._columns)
+        upper = rows * self._cell_height
+        value = min(self._adjustment.get_value(), max(0, upper - height))
+        self._adjustment.configure(value, 0, upper, self._cell_height,
+                                   max(1, height * 0.9), height)
+
+        return old_geometry != (self._columns, self._cell_width,
+                                self._cell_height)
+
+    def _base_cell_size(self):
+        """Size of a cell's button at zoom 1.0, without margins"""
+        text_width = self._digits * BASE_FONT_SIZE * 0.65 + 16
+        return max(BASE_CELL_WIDTH, text_width), BASE_CELL_HEIGHT
+
+    def render_preview(self, width, height):
+        """Paint the whole board, scaled to fit, into a new image surface.
+
+        Boards too big to fit even at MIN_PREVIEW_SCALE are cut off at
+        the bottom.
+        """
+        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, width, height)
+        cr = cairo.Context(surface)
+        cr.set_source_rgb(*BACKGROUND_COLOR)
+        cr.paint()
+        if not self._numbers:
+            return surface
+
+        base_width, base_height = self._base_cell_size()
+        cell_width = base_width + 2 * CELL_MARGIN
+        cell_height = base_height + 2 * CELL_MARGIN
+
+        scale = 1.0
+        while True:
+            columns = max(1, int(width // (cell_width * scale)))
+            rows = math.ceil(len(self._numbers) / columns)
+            if rows * cell_height * scale <= height or \
+                    scale <= MIN_PREVIEW_SCALE:
+                break
+            scale *= 0.8
+
+        cr.scale(scale, scale)
+        cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL,
+                            cairo.FONT_WEIGHT_BOLD)
+        cr.set_font_size(BASE_FONT_SIZE)
+        for index, number in enumerate(self._numbers):
+            row, col = divmod(index, columns)
+            y = row * cell_height
+            if y * scale >= height:
+                break
+            if number in self._selected:
+                color = SELECTED_COLOR
+            else:
+                color = ACTIVE_COLOR
+            self._draw_cell(cr, col * cell_width + CELL_MARGIN,
+                            y + CELL_MARGIN, base_width, base_height,
+                            str(number), color, 1.0)
+        return surface
+
+    def _set_scroll(self, value):
+        upper = self._adjustment.get_upper() - self._adjustment.get_page_size()
+        self._adjustment.set_value(max(0, min(value, upper)))
+
+    def _queue_number(self, number):
+        index = bisect_left(self._numbers, number)
+        if index < len(self._numbers) and self._numbers[index] == number:
+            self._area.queue_draw_area(*self._cell_rect(index))
+
+    def _queue_from(self, index):
+        """Invalidate the cell at index and everything laid out after it"""
+        width = self._area.get_allocated_width()
+        height = self._area.get_allocated_height()
+        x, y, w, h = self._cell_rect(index)
+        if y + h <= 0:
+            x, y = 0, 0
+        if y >= height:
+            return
+        self._area.queue_draw_area(x, y, width - x, h)
+        if y + h < height:
+            self._area.queue_draw_area(0, y + h, width, height - y - h)
+
+    def _size_allocate_cb(self, widget, allocation):
+        self._update_metrics()
+
+    def _scrolled_cb(self, adjustment):
+        self._area.queue_draw()
+
+    def _draw_cb(self, widget, cr):
+        clip_x1, clip_y1, clip_x2, clip_y2 = cr.clip_extents()
+        cr.set_source_rgb(*BACKGROUND_COLOR)
+        cr.paint()
+
+        if not self._numbers:
+            return False
+
+        offset = self._adjustment.get_value()
+        first_row = int((clip_y1 + offset) // self._cell_height)
+        last_row = int((clip_y2 + offset) // self._cell_height)
+        first = max(0, first_row * self._columns)
+        last = min(len(self._numbers), (last_row + 1) * self._columns)
+
+        cr.select_font_face("Sans", cairo.FONT_SLANT_NORMAL,
+                            cairo.FONT_WEIGHT_BOLD)
+        cr.set_font_size(BASE_FONT_SIZE * self._zoom)
+        alpha = 1.0 if self._interactive else INSENSITIVE_ALPHA
+
+        for index in range(first, last):
+            x, y, w, h = self._cell_rect(index)
+            if x + w < clip_x1 or x > clip_x2:
+                continue
+            number = self._numbers[index]
+            if number in self._selected:
+                color = SELECTED_COLOR
+            elif number == self._highlight:
+                color = HIGHLIGHT_COLOR
+            else:
+                color = ACTIVE_COLOR
+            outline = None
+            if self._hint is not None:
+                wins = self._hint(number)
+                if wins is not None:
+                    outline = WINNING_HINT_COLOR if wins else LOSING_HINT_COLOR
+            self._draw_cell(cr, x + CELL_MARGIN, y + CELL_MARGIN,
+                            w - 2 * CELL_MARGIN, h - 2 * CELL_MARGIN,
+                            str(number), color, alpha, outline)
+        return False
+
+    def _draw_cell(self, cr, x, y, w, h, text, color, alpha, outline=None):
+        radius = CELL_RADIUS * self._zoom
+        cr.new_sub_path()
+        cr.arc(x + w - radius, y + radius, radius, -math.pi / 2, 0)
+        cr.arc(x + w - radius, y + h - radius, radius, 0, math.pi / 2)
+        cr.arc(x + radius, y + h - radius, radius, math.pi / 2, math.pi)
+        cr.arc(x + radius, y + radius, radius, math.pi, 3 * math.pi / 2)
+        cr.close_path()
+        cr.set_source_rgba(color[0], color[1], color[2], alpha)
+        if outline is None:
+            cr.fill()
+        else:
+            cr.fill_preserve()
+            cr.set_source_rgba(outline[0], outline[1], outline[2], alpha)
+            cr.set_line_width(HINT_LINE_WIDTH * self._zoom)
+            cr.stroke()
+
+        extents = cr.text_extents(text)
+        cr.move_to(x + (w - extents.width) / 2 - extents.x_bearing,
+                   y + (h - extents.height) / 2 - extents.y_bearing)
+        cr.set_source_rgba(TEXT_COLOR[0], TEXT_COLOR[1], TEXT_COLOR[2], alpha)
+        cr.show_text(text)
+
+    def _button_press_cb(self, widget, event):
+        self._area.grab_focus()
+        if event.button != 1 or event.type != Gdk.EventType.BUTTON_PRESS:
+            return False
+        if not self._interactive:
+            return True
+
+        number = self.number_at(event.x, event.y)
+        if number is not None:
+            self.number_clicked.emit(number)
+        return True
+
+    def _scroll_cb(self, widget, event):
+        if event.direction == Gdk.ScrollDirection.SMOOTH:
+            delta = event.get_scroll_deltas()[2]
+        elif event.direction == Gdk.ScrollDirection.UP:
+            delta = -1
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            delta = 1
+        else:
+            return False
+
+        if event.get_state() & Gdk.ModifierType.CONTROL_MASK:
+            if delta < 0:
+                self.set_zoom(self._zoom * ZOOM_STEP)
+            elif delta > 0:
+                self.set_zoom(self._zoom / ZOOM_STEP)
+        else:
+            self._set_scroll(self._adjustment.get_value() +
+                             delta * self._cell_height)
+        return True
+
+    def _key_press_cb(self, widget, event):
+        if not event.get_state() & Gdk.ModifierType.CONTROL_MASK:
+            return False
+
+        name = Gdk.keyval_name(event.keyval)
+        if name in ("plus", "equal", "KP_Add"):
+            self.set_zoom(self._zoom * ZOOM_STEP)
+        elif name in ("minus", "KP_Subtract"):
+            self.set_zoom(self._zoom / ZOOM_STEP)
+        elif name in ("0", "KP_0"):
+            self.set_zoom(1.0)
+        else:
+            return False
+        return True
@@ -0,0 +1,168 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Append-only checkpoint log of the game in progress.
+
+Every record has the same size, little-endian::
+
+    kind (u8), player (u8), extra (u16), four values (u32 each)
+
+A game is logged as a START record (player: game mode, extra: rule,
+values: opening size, difficulty, player to move, moves already played
+before the log started), a NUMBER record with extra 1 holding the game
+id, one NUMBER record per number on the board, then one MOVE record per
+move (values: the picked numbers, 0 when unused, and the number added)
+and an END record when it is over.  Starting a game truncates the log.
+
+A move costs one small write() to the page cache; the data is synced
+to disk by a background thread at most once per FSYNC_INTERVAL, so a
+crash loses at most that much play.  A partly written last record is
+ignored when reading.
+'''
+
+import os
+import struct
+import threading
+from collections import namedtuple
+
+from rules import RULES
+
+RECORD = struct.Struct('<BBH4I')
+
+START = 1
+NUMBER = 2
+MOVE = 3
+END = 4
+
+# Seconds of play that may be lost in a crash
+FSYNC_INTERVAL = 1.0
+
+RULE_NAMES = list(RULES)
+
+CheckpointGame = namedtuple('CheckpointGame', 'game_id mode rule difficulty '
+                            'current_player base_moves numbers moves ended')
+
+
+class CheckpointLog:
+    '''Writer of the checkpoint log at path.'''
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._dirty = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _write(self, data):
+        if self._fd is None:
+            # Nothing is logged before the first start()
+            return
+        os.write(self._fd, data)
+        self._dirty = True
+        self._wake.set()
+
+    def start(self, game_id, mode, rule, difficulty, current_player,
+              base_moves, numbers):
+        '''Begin the log again for a game in the given state.'''
+        rule_index = RULE_NAMES.index(rule) if rule in RULE_NAMES else 0
+        records = [RECORD.pack(START, mode, rule_index, len(numbers),
+                               difficulty or 0, current_player, base_moves)]
+        records.append(RECORD.pack(NUMBER, 0, 1, game_id, 0, 0, 0))
+        records.extend(RECORD.pack(NUMBER, 0, 0, number, 0, 0, 0)
+                       for number in numbers)
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT |
+                               os.O_APPEND | os.O_TRUNC, 0o600)
+            self._thread = threading.Thread(target=self._sync_loop,
+                                            name='CheckpointLog', daemon=True)
+            self._thread.start()
+        else:
+            os.ftruncate(self._fd, 0)
+        self._write(b''.join(records))
+
+    def move(self, player, selection, diff):
+        values = list(selection) + [0] * (3 - len(selection))
+        self._write(RECORD.pack(MOVE, player, 0, values[0], values[1],
+                                values[2], diff))
+
+    def end(self, winner):
+        self._write(RECORD.pack(END, winner or 0, 0, 0, 0, 0, 0))
+
+    def close(self):
+        if self._fd is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        if self._dirty:
+            os.fsync(self._fd)
+        os.close(self._fd)
+        self._fd = None
+
+    def _sync_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            # Let more moves join this sync
+            if self._stop.wait(FSYNC_INTERVAL):
+                return
+            if self._dirty:
+                self._dirty = False
+                try:
+                    os.fsync(self._fd)
+                except OSError:
+                    return
+
+
+def read_log(path):
+    '''Return the CheckpointGame in the log at path, or None.'''
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    records = RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size])
+    first = next(records, None)
+    if first is None or first[0] != START:
+        return None
+    _, mode, rule_index, count, difficulty, current_player, base_moves = first
+
+    game_id = None
+    numbers = []
+    moves = []
+    ended = False
+    for kind, player, extra, v0, v1, v2, v3 in records:
+        if kind == NUMBER and extra == 1:
+            game_id = v0
+        elif kind == NUMBER and len(numbers) < count:
+            numbers.append(v0)
+        elif kind == MOVE:
+            selection = [v0, v1] + ([v2] if v2 else [])
+            moves.append((player, selection, v3))
+        elif kind == END:
+            ended = True
+        else:
+            # Anything else is not ours, eg. zeroes left by a crash
+            break
+
+    rule = RULE_NAMES[rule_index] if rule_index < len(RULE_NAMES) else None
+    return CheckpointGame(game_id, mode, rule, difficulty, current_player,
+                          base_moves, numbers, moves, ended)
@@ -0,0 +1,197 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Compact binary encoding of the game's collaboration messages.
+
+Each message the game sends often has a schema: an id, its integer
+fields and an optional list of numbers.  A message matching its schema
+exactly is packed with struct, little-endian::
+
+    version (u8), schema id (u8), flags (u8), the fields (absent ones
+    as 0), list length (u16), the list
+
+The low five bits of flags tell which fields are present, bits 5 and 6
+the width of the list items (u8, u16 or u32, the smallest that fits)
+and bit 7 whether there is a list.  Anything else, or a value out of
+range, is not encoded and goes as JSON.
+
+Over a text channel the bytes are sent in base64 behind TEXT_PREFIX,
+which no JSON text starts with.  Compare the two encodings with::
+
+    python3 codec.py
+'''
+
+import json
+import struct
+import timeit
+from base64 import b64decode, b64encode
+
+VERSION = 2
+
+TEXT_PREFIX = '~'
+
+FIELD_BITS = 5
+HAS_NUMBERS = 0x80
+WIDTHS = ('B', 'H', 'I')
+
+
+class MessageSchema:
+    '''A message with action `action` and the given integer fields.
+
+    fields is a sequence of (key, struct code) pairs; numbers names
+    the key holding a list of numbers, if any.
+    '''
+
+    def __init__(self, schema_id, action, fields, numbers=None):
+        if len(fields) > FIELD_BITS:
+            raise ValueError(f'at most {FIELD_BITS} fields fit the flags')
+        self.schema_id = schema_id
+        self.action = action
+        self.fields = tuple(key for key, _ in fields)
+        self.numbers = numbers
+        self.keys = {'action', numbers, *self.fields} - {None}
+        self.header = struct.Struct('<BBB' + ''.join(code for _, code in fields) + 'H')
+
+    def encode(self, msg):
+        mask = 0
+        values = []
+        for bit, key in enumerate(self.fields):
+            value = msg.get(key)
+            if value is None:
+                values.append(0)
+                continue
+            if type(value) is not int:
+                return None
+            mask |= 1 << bit
+            values.append(value)
+
+        numbers = msg.get(self.numbers, ()) if self.numbers else ()
+        width = 0
+        if self.numbers in msg:
+            if type(numbers) is not list:
+                return None
+            mask |= HAS_NUMBERS
+        count = len(numbers)
+        try:
+            if numbers:
+                largest = max(numbers)
+                width = 0 if largest < 0x100 else 1 if largest < 0x10000 else 2
+                mask |= width << FIELD_BITS
+            return (self.header.pack(VERSION, self.schema_id, mask, *values, count) +
+                    struct.pack(f'<{count}{WIDTHS[width]}', *numbers))
+        except (struct.error, TypeError):
+            # A value out of range, or a number that is not an int
+            return None
+
+    def decode(self, payload):
+        _, _, mask, *values, count = self.header.unpack_from(payload)
+        msg = {'action': self.action}
+        for bit, (key, value) in enumerate(zip(self.fields, values)):
+            if mask & (1 << bit):
+                msg[key] = value
+        if mask & HAS_NUMBERS:
+            width = WIDTHS[(mask >> FIELD_BITS) & 3]
+            msg[self.numbers] = list(struct.unpack_from(
+                f'<{count}{width}', payload, self.header.size))
+        return msg
+
+
+class MessageCodec:
+    '''Encodes the messages some schema describes; named for negotiation.'''
+
+    prefix = TEXT_PREFIX
+
+    def __init__(self, name, schemas):
+        self.name = name
+        self._by_action = {schema.action: schema for schema in schemas}
+        self._by_id = {schema.schema_id: schema for schema in schemas}
+
+    def encode(self, msg):
+        '''Return the message as bytes, or None if it must go as JSON.'''
+        if type(msg) is not dict:
+            return None
+        schema = self._by_action.get(msg.get('action'))
+        if schema is None or not schema.keys.issuperset(msg):
+            return None
+        # None would come back as an absent key
+        if None in msg.values():
+            return None
+        return schema.encode(msg)
+
+    def decode(self, payload):
+        if len(payload) < 2 or payload[0] != VERSION:
+            raise ValueError(f'unknown message version {payload[:1]!r}')
+        schema = self._by_id.get(payload[1])
+        if schema is None:
+            raise ValueError(f'unknown message schema {payload[1]}')
+        try:
+            return schema.decode(payload)
+        except struct.error as e:
+            raise ValueError(f'truncated message: {e}') from None
+
+    def encode_text(self, msg):
+        '''Return the message as text, or None if it must go as JSON.'''
+        payload = self.encode(msg)
+        if payload is None:
+            return None
+        return TEXT_PREFIX + b64encode(payload).decode('ascii')
+
+    def decode_text(self, text):
+        '''Decode text from encode_text(); ValueError for anything else.'''
+        if not text.startswith(TEXT_PREFIX):
+            raise ValueError('not an encoded message')
+        return self.decode(b64decode(text[len(TEXT_PREFIX):], validate=True))
+
+
+GAME_CODEC = MessageCodec(f'euclids-{VERSION}', [
+    # The picked numbers go up to the stress preset's max_value
+    MessageSchema(1, 'move', (('player', 'B'), ('num1', 'I'), ('num2', 'I'),
+                              ('num3', 'I'), ('diff', 'I')),
+                  numbers='active_numbers'),
+    MessageSchema(2, 'game_over', (('winner', 'B'),), numbers='final_state'),
+])
+
+
+def main():
+    board = [3, 6, 9, 12, 15, 18, 21, 24, 27, 30, 33, 36, 39, 42, 45, 48]
+    messages = {
+        'move': {'player': 1, 'num1': 48, 'num2': 3, 'diff': 45,
+                 'action': 'move', 'active_numbers': board},
+        'game_over': {'action': 'game_over', 'winner': 2,
+                      'final_state': board},
+    }
+    for name, msg in messages.items():
+        text = json.dumps(msg)
+        packed = GAME_CODEC.encode_text(msg)
+        assert GAME_CODEC.decode_text(packed) == msg
+
+        def per_call(statement):
+            timer = timeit.Timer(statement, globals=locals())
+            count, _ = timer.autorange()
+            return min(timer.repeat(5, count)) / count * 1e6
+
+        print(f"{name}: json {len(text)} bytes, "
+              f"encode {per_call(lambda: json.dumps(msg)):.2f} us, "
+              f"decode {per_call(lambda: json.loads(text)):.2f} us")
+        print(f"{' ' * len(name)}  {GAME_CODEC.name} {len(packed)} bytes, "
+              f"encode {per_call(lambda: GAME_CODEC.encode_text(msg)):.2f} us, "
+              f"decode {per_call(lambda: GAME_CODEC.decode_text(packed)):.2f} us")
+
+
+if __name__ == '__main__':
+    main()
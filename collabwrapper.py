@@ -61,11 +61,23 @@ Using CollabWrapper
         if action == 'entry_changed':
             self._entry.set_text(msg.get('new_text'))
 
+5. Optionally, pass a codec to send messages more compactly than JSON::
+
+    self._collab = CollabWrapper(self, codec=MY_CODEC)
+
+   A codec has a `name`, a `prefix` no JSON text starts with,
+   `encode_text(msg)` returning a str starting with the prefix, or None
+   for messages it cannot encode, and `decode_text(text)` raising
+   ValueError on bad input.  Buddies announce their codecs when they
+   join; the codec is only used while every buddy has announced it,
+   so buddies running older versions keep receiving JSON.
+
 '''
 
 import os
 import json
 import socket
+import time
 from gettext import gettext as _
 
 import gi
@@ -100,6 +112,7 @@ _logger = logging.getLogger('CollabWrapper')
 
 ACTION_INIT_REQUEST = '!!ACTION_INIT_REQUEST'
 ACTION_INIT_RESPONSE = '!!ACTION_INIT_RESPONSE'
+ACTION_HELLO = '!!ACTION_HELLO'
 ACTIVITY_FT_MIME = 'x-sugar/from-activity'
 
 
@@ -159,7 +172,7 @@ class CollabWrapper(GObject.GObject):
     buddy_left = GObject.Signal('buddy_left', arg_types=[object])
     incoming_file = GObject.Signal('incoming_file', arg_types=[object, object])
 
-    def __init__(self, activity):
+    def __init__(self, activity, codec=None):
         _logger.debug('__init__')
         GObject.GObject.__init__(self)
         self.activity = activity
@@ -167,6 +180,9 @@ class CollabWrapper(GObject.GObject):
         self._leader = False
         self._init_waiting = False
         self._text_channel = None
+        self._codec = codec
+        # Codec names announced by each buddy; empty until it says hello
+        self._peer_codecs = {}
 
     def setup(self):
         '''
@@ -235,9 +251,12 @@ class CollabWrapper(GObject.GObject):
         self._listen_for_channels()
         self._init_waiting = True
         self.post({'action': ACTION_INIT_REQUEST})
+        self._say_hello()
 
         for buddy in self.shared_activity.get_joined_buddies():
+            self._peer_codecs.setdefault(_buddy_key(buddy), set())
             self.buddy_joined.emit(buddy)
+        self._update_codec()
 
         self.joined.emit()
 
@@ -246,7 +265,8 @@ class CollabWrapper(GObject.GObject):
         _logger.debug('_setup_text_channel')
         self._text_channel = _TextChannelWrapper(
             self.shared_activity.telepathy_text_chan,
-            self.shared_activity.telepathy_conn)
+            self.shared_activity.telepathy_conn,
+            self._codec)
 
         # Tell the text channel what callback to use for incoming
         # text messages.
@@ -299,6 +319,13 @@ class CollabWrapper(GObject.GObject):
         '''Process a message when it is received.'''
         _logger.debug('__received_cb')
         action = msg.get('action')
+        if action == ACTION_HELLO:
+            self._peer_codecs[_buddy_key(buddy)] = set(msg.get('codecs', ()))
+            if not msg.get('reply'):
+                self._say_hello(reply=True)
+            self._update_codec()
+            return
+
         if action == ACTION_INIT_REQUEST:
             if self._leader:
                 data = self.activity.get_data()
@@ -320,6 +347,32 @@ class CollabWrapper(GObject.GObject):
         _logger.debug('Received message from %s: %r', nick, msg)
         self.message.emit(buddy, msg)
 
+    def _say_hello(self, reply=False):
+        '''Announce our codec to the buddies; they answer with theirs.'''
+        if self._codec is not None:
+            # Always JSON, so that any buddy can read it
+            self.post({'action': ACTION_HELLO, 'codecs': [self._codec.name],
+                       'reply': reply})
+
+    def _update_codec(self):
+        if self._text_channel is None or self._codec is None:
+            return
+        enabled = bool(self._peer_codecs) and all(
+            self._codec.name in codecs
+            for codecs in self._peer_codecs.values())
+        if enabled != self._text_channel.codec_enabled:
+            _logger.debug('%s messages with %s', 'Encoding' if enabled
+                          else 'Not encoding', self._codec.name)
+        self._text_channel.codec_enabled = enabled
+
+    @property
+    def stats(self):
+        '''Messages, bytes and seconds spent encoding and decoding
+        on the text channel, or None if not shared.'''
+        if self._text_channel is None:
+            return None
+        return dict(self._text_channel.stats)
+
     def send_file_memory(self, buddy, data, description):
         '''
         Send a one to one file transfer from memory to a buddy.  The
@@ -376,10 +429,14 @@ class CollabWrapper(GObject.GObject):
 
     def __buddy_joined_cb(self, sender, buddy):
         '''A buddy joined.'''
+        self._peer_codecs.setdefault(_buddy_key(buddy), set())
+        self._update_codec()
         self.buddy_joined.emit(buddy)
 
     def __buddy_left_cb(self, sender, buddy):
         '''A buddy left.'''
+        self._peer_codecs.pop(_buddy_key(buddy), None)
+        self._update_codec()
         self.buddy_left.emit(buddy)
 
     def get_client_name(self):
@@ -400,6 +457,15 @@ class CollabWrapper(GObject.GObject):
         return self._leader
 
 
+def _buddy_key(buddy):
+    '''Something identifying a buddy across signals.'''
+    if buddy is None:
+        return None
+    if isinstance(buddy, dict):
+        return buddy.get('nick')
+    return buddy.props.key or buddy.props.nick
+
+
 FT_STATE_NONE = 0
 FT_STATE_PENDING = 1
 FT_STATE_ACCEPTED = 2
@@ -736,12 +802,17 @@ class OutgoingBlobTransfer(_BaseOutgoingTransfer):
 class _TextChannelWrapper(object):
     '''Wrapper for a telepathy Text Channel'''
 
-    def __init__(self, text_chan, conn):
+    def __init__(self, text_chan, conn, codec=None):
         '''Connect to the text channel'''
         self._activity_cb = None
         self._activity_close_cb = None
         self._text_chan = text_chan
         self._conn = conn
+        self._codec = codec
+        # Set once every buddy is known to decode the codec
+        self.codec_enabled = False
+        self.stats = dict(sent=0, sent_bytes=0, encode_time=0.0,
+                          received=0, received_bytes=0, decode_time=0.0)
         self._signal_matches = []
         m = self._text_chan[CHANNEL_INTERFACE].connect_to_signal(
             'Closed', self._closed_cb)
@@ -750,7 +821,16 @@ class _TextChannelWrapper(object):
     def post(self, msg):
         if msg is not None:
             _logger.debug('post')
-            self._send(json.dumps(msg))
+            start = time.perf_counter()
+            text = None
+            if self.codec_enabled:
+                text = self._codec.encode_text(msg)
+            if text is None:
+                text = json.dumps(msg)
+            self.stats['encode_time'] += time.perf_counter() - start
+            self.stats['sent'] += 1
+            self.stats['sent_bytes'] += len(text)
+            self._send(text)
 
     def _send(self, text):
         '''Send text over the Telepathy text channel.'''
@@ -808,7 +888,22 @@ class _TextChannelWrapper(object):
             # Exclude any auxiliary messages
             return
 
-        msg = json.loads(text)
+        start = time.perf_counter()
+        # Decoded even before we chose to send with the codec: the
+        # buddy may have heard our hello first
+        if self._codec is not None and text.startswith(self._codec.prefix):
+            try:
+                msg = self._codec.decode_text(text)
+            except ValueError as e:
+                _logger.error('Dropping undecodable message: %s', e)
+                self._text_chan[
+                    CHANNEL_TYPE_TEXT].AcknowledgePendingMessages([identity])
+                return
+        else:
+            msg = json.loads(text)
+        self.stats['decode_time'] += time.perf_counter() - start
+        self.stats['received'] += 1
+        self.stats['received_bytes'] += len(text)
 
         if self._activity_cb:
             try:
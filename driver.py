@@ -0,0 +1,365 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Scripted input driver and click latency benchmark for `Game`.
+
+A script is a JSON file describing one game::
+
+    {"mode": "local", "numbers": [24, 66], "clicks": [66, 24, 42, 24]}
+
+`mode` is "local" (two humans on one device) or "bot".  Record one by
+playing in a window::
+
+    python3 driver.py record clicks.json --numbers 24 66
+
+Replay it and write a timing report (run under Xvfb, or pass
+--offscreen to render into a Gtk.OffscreenWindow)::
+
+    python3 driver.py replay clicks.json --output report.json
+
+For every click the report holds the time spent in the click handler,
+the time until the coalesced UI refresh ran and the time until the next
+frame was painted, plus the time the bot took to answer in "bot" mode.
+
+Soak mode plays thousands of games back to back, each saved and
+restored through the journal state halfway, and fails if memory keeps
+growing once the first games have warmed the caches up, or if a game is
+won by the player the hints said would lose::
+
+    python3 driver.py soak --games 2000 --max-growth-kb 512 --offscreen
+'''
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, Gdk
+
+from game import Bot, Difficulty, Game, GameMode
+from memtrack import MemoryTracker
+from pacing import PacingMode
+from positions import PRESETS, get_generator
+
+MODES = {
+    'local': GameMode.LOCAL_MULTIPLAYER,
+    'bot': GameMode.VS_BOT,
+}
+
+# Seconds to wait for a frame or a bot reply before giving up on a step
+STEP_TIMEOUT = 5.0
+
+
+class ScriptedDriver:
+    '''Runs a `Game` in its own window and feeds it clicks.'''
+
+    def __init__(self, offscreen=False):
+        self.game = Game(standalone=False)
+        self.game.headless = True
+        for mode in GameMode:
+            self.game.pacer.set_mode(mode, PacingMode.INSTANT)
+        self.offscreen = offscreen
+
+        content = self.game.main_box
+        if content.get_parent():
+            content.get_parent().remove(content)
+
+        if offscreen:
+            self.window = Gtk.OffscreenWindow()
+        else:
+            self.window = Gtk.Window(title="Euclid's Game (scripted)")
+        self.window.set_default_size(800, 600)
+        self.window.add(content)
+        self.window.show_all()
+
+        self._frames = 0
+        self._clock = self.window.get_frame_clock()
+        self._clock.connect('after-paint', self._after_paint_cb)
+
+    def _after_paint_cb(self, clock):
+        self._frames += 1
+
+    def _iterate_until(self, predicate, timeout=STEP_TIMEOUT):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                return False
+            if not Gtk.main_iteration_do(False):
+                time.sleep(0.0005)
+        return True
+
+    def _wait_for_frame(self):
+        '''Let pending refreshes run, then wait for the next painted frame.'''
+        self._iterate_until(lambda: not self.game.refresh_pending)
+        frames = self._frames
+        self._clock.request_phase(Gdk.FrameClockPhase.PAINT)
+        return self._iterate_until(lambda: self._frames > frames)
+
+    def _bot_busy(self):
+        return (self.game.pacer.pending or self.game.refresh_pending or
+                self.game.ponderer.answering)
+
+    def start(self, script):
+        self.game.game_mode = MODES[script.get('mode', 'local')]
+        self.game.reset_game(script['numbers'])
+        self.game.show_game()
+        self._wait_for_frame()
+
+    def click(self, number):
+        '''Click one number and return the step timings in ms.'''
+        start = time.perf_counter()
+        self.game.board.number_clicked.emit(number)
+        handled = time.perf_counter()
+
+        self._iterate_until(lambda: not self.game.refresh_pending)
+        refreshed = time.perf_counter()
+        presented = self._wait_for_frame()
+        painted = time.perf_counter()
+
+        step = {
+            'number': number,
+            'handler_ms': (handled - start) * 1000,
+            'refresh_ms': (refreshed - start) * 1000,
+            'frame_ms': (painted - start) * 1000,
+            'presented': presented,
+        }
+
+        if self._bot_busy():
+            self._iterate_until(lambda: not self._bot_busy())
+            self._wait_for_frame()
+            step['bot_ms'] = (time.perf_counter() - painted) * 1000
+        return step
+
+    def play_game(self, numbers, bot):
+        '''Play one local game to the end as fast as the UI allows.
+
+        Returns True if the winner is the one the hints named before
+        the last move.
+        '''
+        self.game.game_mode = GameMode.LOCAL_MULTIPLAYER
+        self.game.reset_game(numbers)
+        self.game.show_game()
+        halfway = self.game.position.moves_left() // 2
+
+        expected = None
+        while not self.game.game_over:
+            if len(self.game.move_history) == halfway:
+                # Resume from the journal state, as after a restart
+                self.game.load_state(self.game.save_state())
+            mover = self.game.current_player
+            expected = (mover if self.game.position.mover_wins()
+                        else 2 if mover == 1 else 1)
+            move = bot.get_move({'active_numbers': self.game.active_numbers,
+                                 'position': self.game.position})
+            for number in move:
+                self.game.board.number_clicked.emit(number)
+            self._iterate_until(lambda: not self.game.refresh_pending)
+        self._wait_for_frame()
+        return expected is None or self.game.winner == expected
+
+    def run(self, script):
+        '''Play a whole script and return the per-step timings.'''
+        self.start(script)
+        steps = []
+        for number in script['clicks']:
+            if self.game.game_over:
+                break
+            steps.append(self.click(number))
+        return steps
+
+
+class ClickRecorder:
+    '''Collects the numbers clicked on a game's board into a script.'''
+
+    def __init__(self, game, mode, numbers):
+        self.script = {'mode': mode, 'numbers': list(numbers), 'clicks': []}
+        game.board.connect('number-clicked', self._clicked_cb)
+
+    def _clicked_cb(self, board, number):
+        self.script['clicks'].append(number)
+
+
+def summarize(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'mean': statistics.mean(ordered),
+        'median': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1],
+    }
+
+
+def build_report(script_path, script, runs, offscreen):
+    steps = [step for run in runs for step in run]
+    summary = {}
+    for key in ('handler_ms', 'refresh_ms', 'frame_ms', 'bot_ms'):
+        values = [step[key] for step in steps if key in step]
+        if values:
+            summary[key] = summarize(values)
+
+    return {
+        'script': script_path,
+        'mode': script.get('mode', 'local'),
+        'numbers': script['numbers'],
+        'repeat': len(runs),
+        'timestamp': time.time(),
+        'environment': {
+            'python': sys.version.split()[0],
+            'gtk': '%d.%d.%d' % (Gtk.get_major_version(),
+                                 Gtk.get_minor_version(),
+                                 Gtk.get_micro_version()),
+            'offscreen': offscreen,
+        },
+        'summary': summary,
+        'runs': runs,
+    }
+
+
+def _soak(args):
+    driver = ScriptedDriver(offscreen=args.offscreen)
+    bot = Bot(Difficulty.EASY)
+    generator = get_generator(args.preset, seed=args.seed)
+    warmup = max(1, min(args.warmup, args.games - 1))
+
+    tracker = MemoryTracker()
+    tracker.start()
+    baseline = None
+    mismatches = 0
+    for game in range(1, args.games + 1):
+        if not driver.play_game(generator.generate(), bot):
+            mismatches += 1
+        sampled = game % args.sample == 0 or game in (warmup, args.games)
+        entry = tracker.mark(game, gobjects=sampled)
+        if game == warmup:
+            tracker.snapshot_baseline()
+            baseline = len(tracker.marks) - 1
+        if sampled:
+            print(f"game {game}: traced {entry['traced_kb']:.0f} KiB, "
+                  f"rss {entry['rss_kb']} KiB, {entry['gobjects']} GObjects")
+
+    growth = tracker.growth_since(baseline)
+    top = tracker.top_growth()
+    tracker.stop()
+
+    failed = (growth['traced_kb'] > args.max_growth_kb or
+              growth.get('gobjects', 0) > args.max_gobject_growth)
+    print(f"After game {warmup}: traced {growth['traced_kb']:+.1f} KiB, "
+          f"{growth.get('gobjects', 0):+d} GObjects, "
+          f"rss {growth.get('rss_kb', 0):+d} KiB")
+    for line in top:
+        print(f"  {line}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'games': args.games, 'warmup': warmup,
+                       'growth': growth, 'top_growth': top,
+                       'mismatches': mismatches,
+                       'failed': failed or bool(mismatches),
+                       'marks': tracker.marks}, f, indent=2)
+    if mismatches:
+        print(f"FAIL: {mismatches} games were won by the player the hints "
+              f"said would lose")
+    if failed:
+        print("FAIL: memory grew past the threshold")
+    if failed or mismatches:
+        sys.exit(1)
+
+
+def _record(args):
+    numbers = args.numbers or [random.randint(20, 40), random.randint(60, 80)]
+    game = Game(standalone=False)
+    game.game_mode = MODES[args.mode]
+    game.reset_game(numbers)
+    game.show_game()
+    recorder = ClickRecorder(game, args.mode, numbers)
+
+    content = game.main_box
+    if content.get_parent():
+        content.get_parent().remove(content)
+    window = Gtk.Window(title="Euclid's Game (recording)")
+    window.set_default_size(800, 600)
+    window.add(content)
+    window.connect('destroy', Gtk.main_quit)
+    window.show_all()
+    Gtk.main()
+
+    with open(args.script, 'w') as f:
+        json.dump(recorder.script, f)
+    print(f"Recorded {len(recorder.script['clicks'])} clicks to {args.script}")
+
+
+def _replay(args):
+    with open(args.script) as f:
+        script = json.load(f)
+
+    driver = ScriptedDriver(offscreen=args.offscreen)
+    runs = [driver.run(script) for _ in range(args.repeat)]
+    report = build_report(args.script, script, runs, args.offscreen)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    for key, stats in report['summary'].items():
+        print(f"{key}: mean {stats['mean']:.2f} median {stats['median']:.2f} "
+              f"p95 {stats['p95']:.2f} max {stats['max']:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='record clicks into a script')
+    record.add_argument('script')
+    record.add_argument('--mode', choices=sorted(MODES), default='local')
+    record.add_argument('--numbers', type=int, nargs='+')
+    record.set_defaults(func=_record)
+
+    replay = commands.add_parser('replay', help='replay a script and time it')
+    replay.add_argument('script')
+    replay.add_argument('--output', help='write the JSON report here')
+    replay.add_argument('--repeat', type=int, default=1)
+    replay.add_argument('--offscreen', action='store_true')
+    replay.set_defaults(func=_replay)
+
+    soak = commands.add_parser('soak', help='play many games, check memory')
+    soak.add_argument('--games', type=int, default=1000)
+    soak.add_argument('--warmup', type=int, default=20,
+                      help='games played before the baseline is taken')
+    soak.add_argument('--sample', type=int, default=100,
+                      help='count GObjects every this many games')
+    soak.add_argument('--preset', choices=sorted(PRESETS), default='classic')
+    soak.add_argument('--seed', type=int, default=0)
+    soak.add_argument('--max-growth-kb', type=float, default=1024)
+    soak.add_argument('--max-gobject-growth', type=int, default=50)
+    soak.add_argument('--output', help='write the per-game JSON report here')
+    soak.add_argument('--offscreen', action='store_true')
+    soak.set_defaults(func=_soak)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
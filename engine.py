@@ -0,0 +1,139 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+from bisect import insort
+from functools import reduce
+from math import gcd
+
+
+class Position:
+    '''
+    A board of numbers together with an index of its legal moves.
+
+    `legal` maps every difference that may currently be added to the
+    number of pairs on the board producing it, and `legal_pairs` is the
+    sum of those counts.  Both are kept up to date by `add`, which only
+    looks at the pairs involving the new number, so a move costs O(n)
+    and game-over and move-count queries are O(1).
+
+    `numbers` is the sorted board; treat it as read-only.
+
+    Every difference is a multiple of the board's gcd, so the gcd and
+    the maximum never change during a game and the final board is every
+    multiple of the gcd up to the maximum.  That makes the number of
+    moves left, and with it the winner, an O(1) question.
+
+    This is the kernel of the difference rule; rules.py has the others,
+    which share this interface.
+    '''
+
+    # Numbers picked per move, and whether moves_left() is exact
+    arity = 2
+    closed_form = True
+    # Whoever makes the last move wins: the player left without a move
+    # loses.  winner(), mover_wins() and the bots' playouts all read this.
+    last_move_wins = True
+
+    def __init__(self, numbers=()):
+        self.numbers = sorted(set(numbers))
+        self._members = set(self.numbers)
+        self.legal = {}
+        self.legal_pairs = 0
+        self.gcd = reduce(gcd, self.numbers, 0)
+
+        numbers = self.numbers
+        for i in range(len(numbers)):
+            for j in range(i + 1, len(numbers)):
+                diff = numbers[j] - numbers[i]
+                if diff not in self._members:
+                    self.legal[diff] = self.legal.get(diff, 0) + 1
+                    self.legal_pairs += 1
+
+    def __contains__(self, number):
+        return number in self._members
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def copy(self):
+        position = object.__new__(type(self))
+        position.__dict__.update(self.__dict__)
+        position.numbers = list(self.numbers)
+        position._members = set(self._members)
+        position.legal = dict(self.legal)
+        return position
+
+    def is_over(self):
+        return not self.legal
+
+    def moves_left(self):
+        '''Number of moves until the board is closed, whatever is played.'''
+        if not self.numbers:
+            return 0
+        return self.numbers[-1] // self.gcd - len(self.numbers)
+
+    def mover_wins(self):
+        '''True if the player about to move wins.'''
+        return (self.moves_left() % 2 == 1) == self.last_move_wins
+
+    def winner(self, last_player):
+        '''The winner of a game over once last_player (1 or 2) has moved.'''
+        if self.last_move_wins:
+            return last_player
+        return 2 if last_player == 1 else 1
+
+    def result_of(self, num1, num2):
+        '''The number a move picking num1 and num2 would add.'''
+        return abs(num1 - num2)
+
+    def is_legal(self, num1, num2):
+        return (num1 != num2 and num1 in self._members and
+                num2 in self._members and abs(num1 - num2) in self.legal)
+
+    def add(self, diff):
+        '''Put diff on the board and update the legal move index.'''
+        # Pairs that used to produce diff are blocked from now on.
+        self.legal_pairs -= self.legal.pop(diff, 0)
+        self._members.add(diff)
+
+        for number in self.numbers:
+            new_diff = abs(number - diff)
+            if new_diff not in self._members:
+                self.legal[new_diff] = self.legal.get(new_diff, 0) + 1
+                self.legal_pairs += 1
+
+        insort(self.numbers, diff)
+
+    def pairs_after(self, diff):
+        '''Number of legal pairs left for the opponent after adding diff.'''
+        count = self.legal_pairs - self.legal.get(diff, 0)
+        for number in self.numbers:
+            new_diff = abs(number - diff)
+            if new_diff != diff and new_diff not in self._members:
+                count += 1
+        return count
+
+    def pairs_for(self, diff):
+        '''Yield every (smaller, larger) pair on the board producing diff.'''
+        members = self._members
+        for number in self.numbers:
+            if number + diff in members:
+                yield (number, number + diff)
+
+    def pair_for(self, diff):
+        '''Return the pair with the smallest numbers producing diff.'''
+        return next(self.pairs_for(diff), None)
@@ -17,80 +17,201 @@
 
 import gi
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, Pango
 import random
 from enum import Enum
+from board import BoardView
+from styles import add_provider_for_screen, set_style_classes
+from pacing import Pacer, PacingMode
+from keyboard import KeyboardInput
+from positions import PRESETS, board_gcd, get_generator
+from rules import DEFAULT_RULE, RULES, get_rule
+from ponder import Ponderer
+from replay import ReplayCursor, to_moves
+import os
+import time
 
 class Difficulty(Enum):
     EASY = 1
     MEDIUM = 2
     EXPERT = 3
+    MASTER = 4
 
 class GameMode(Enum):
     VS_BOT = 1
     LOCAL_MULTIPLAYER = 2
     NETWORK_MULTIPLAYER = 3
 
+GAME_CSS = b"""
+#menu_box {
+    background-color: #f0f0f0;
+    padding: 20px;
+}
+
+#game_box {
+    background-color: #ffffff;
+}
+
+.info_label {
+    font-size: 16pt;
+    font-weight: bold;
+    padding: 10px;
+}
+
+.turn_label {
+    font-size: 14pt;
+    padding: 5px;
+}
+
+.turn_label.turn_flash {
+    background-color: #4CAF50;
+    color: white;
+}
+"""
+
+REFRESH_BOARD = 'board'
+REFRESH_SELECTION = 'selection'
+REFRESH_STATS = 'stats'
+REFRESH_TURN = 'turn'
+REFRESH_ALL = (REFRESH_BOARD, REFRESH_SELECTION, REFRESH_STATS, REFRESH_TURN)
+
+# Nominal bot pacing in ms, see pacing.Pacer
+BOT_THINK_DELAY = 1000
+BOT_PREVIEW_DELAY = 500
+BOT_RESUME_DELAY = 500
+
+# Makes generated starting positions reproducible, eg. EUCLIDS_SEED=42
+SEED_ENV = 'EUCLIDS_SEED'
+
+# Positions drawn before giving up on an opening with a legal move
+OPENING_ATTEMPTS = 100
+
+BOARD_PRESET_LABELS = (
+    ('classic', "Classic"),
+    ('challenge', "Challenge"),
+    ('stress', "Stress"),
+)
+
+PLAYER_COLORS = {
+    1: '#d32f2f',  # Red for player 1
+    2: '#1976d2',  # Blue for player 2
+}
+
 class Bot:
-    def __init__(self, difficulty):
+    def __init__(self, difficulty, rule=DEFAULT_RULE):
         self.difficulty = difficulty
+        self.rule = rule
         self.opponent_buddy = None
         self.buddy_available = False
+        self._search = None
     
-    def get_move(self, game_state):
-        active_numbers = game_state['active_numbers']
-        valid_moves = []
+    @property
+    def can_think(self):
+        """True if the bot keeps a search that think() can grow"""
+        return self.difficulty == Difficulty.MASTER
+    
+    def _get_search(self):
+        if self._search is None:
+            # Imported on first use: multiprocessing is not needed
+            # before a Master game is played
+            from mcts import MCTSSearch
+            self._search = MCTSSearch(rule=self.rule)
+        return self._search
+    
+    def think_steps(self, position, wake=None):
+        """Grow the Master search for position, one short step per next()
         
-        for i in range(len(active_numbers)):
-            for j in range(i + 1, len(active_numbers)):
-                diff = abs(active_numbers[i] - active_numbers[j])
-                if diff not in active_numbers:
-                    valid_moves.append((active_numbers[i], active_numbers[j]))
+        A step yielding True waits on the workers, which call wake()
+        when they are done.
+        """
+        return self._get_search().think_steps(position, wake)
+    
+    def prepare(self):
+        """Start the Master search workers before the first move"""
+        if self.can_think:
+            self._get_search().start()
+    
+    def move_steps(self, position, wake=None):
+        """get_move() as a generator yielding between short steps
+        
+        The move is the generator's return value.  The Expert scoring
+        and the Master search are split up, the latter as in
+        think_steps(); the other levels are quick in one go.
+        """
+        if self.difficulty == Difficulty.MASTER and not position.is_over():
+            diff = yield from self._get_search().search_steps(position, wake)
+            return position.pair_for(diff)
+        if self.difficulty != Difficulty.EXPERT or position.is_over():
+            return self.get_move({'active_numbers': position.numbers,
+                                  'position': position})
+        best_diff = best_pairs = None
+        for diff in sorted(position.legal):
+            pairs = position.pairs_after(diff)
+            if best_pairs is None or pairs < best_pairs:
+                best_diff, best_pairs = diff, pairs
+            yield
+        return position.pair_for(best_diff)
+    
+    def close(self):
+        """Stop the search workers of a Master bot"""
+        if self._search is not None:
+            self._search.close()
+            self._search = None
+    
+    def get_move(self, game_state):
+        position = game_state.get('position')
+        if position is None:
+            position = get_rule(self.rule).new_position(game_state['active_numbers'])
         
-        if not valid_moves:
+        if position.is_over():
             return None
         
         if self.difficulty == Difficulty.EASY:
-            return random.choice(valid_moves)
+            # Weighting each difference by its pair count keeps this a
+            # uniform choice over all legal pairs.
+            diffs = list(position.legal)
+            weights = [position.legal[diff] for diff in diffs]
+            diff = random.choices(diffs, weights=weights)[0]
+            return random.choice(list(position.pairs_for(diff)))
         elif self.difficulty == Difficulty.MEDIUM:
-            valid_moves.sort(key=lambda x: abs(x[0] - x[1]))
-            return valid_moves[0]
+            return position.pair_for(min(position.legal))
+        elif self.difficulty == Difficulty.MASTER:
+            return position.pair_for(self._get_search().search(position))
         else: 
-            best_move = None
-            min_opponent_moves = float('inf')
-            
-            for move in valid_moves:
-                temp_numbers = active_numbers.copy()
-                diff = abs(move[0] - move[1])
-                temp_numbers.append(diff)
-                
-                opponent_moves = 0
-                for i in range(len(temp_numbers)):
-                    for j in range(i + 1, len(temp_numbers)):
-                        if abs(temp_numbers[i] - temp_numbers[j]) not in temp_numbers:
-                            opponent_moves += 1
-                
-                if opponent_moves < min_opponent_moves:
-                    min_opponent_moves = opponent_moves
-                    best_move = move
-            
-            return best_move
+            # Every pair with the same difference leads to the same
+            # position, so only distinct differences need scoring.
+            best_diff = min(sorted(position.legal), key=position.pairs_after)
+            return position.pair_for(best_diff)
 
 class Game(Gtk.Window):
-    def __init__(self):
+    def __init__(self, standalone=True):
         super().__init__(title="Euclid's Game")
         self.set_default_size(800, 600)
         self.set_border_width(10)
         
         self.game_mode = GameMode.VS_BOT
         self.difficulty = Difficulty.MEDIUM
-        self.bot = Bot(self.difficulty)
+        self._bot = None
+        self.rule = get_rule(DEFAULT_RULE)
         self.active_numbers = []
         self.selected_numbers = []
         self.current_player = 1
         self.game_over = False
         self.winner = None
         self.move_history = []
+        self.board_preset = 'classic'
+        self.position_seed = None
+        self._seed_sequence = None
+        self.replay = None
+        self._replay_moves = []
+        self.show_hints = False
+        # A GameArchive set by the activity; finished games are recorded
+        self.archive = None
+        self._started_at = None
+        # A checkpoint.CheckpointLog set by the activity; every move is
+        # appended to it as it is played
+        self.checkpoints = None
+        self.checkpoint_id = None
 
         self._collab = None
         self.is_host = False
@@ -99,78 +220,54 @@ class Game(Gtk.Window):
         self.opponent_buddy = None
         self.game_started = False
         
+        self._dirty = set()
+        self._refresh_id = None
+        self.pacer = Pacer({GameMode.VS_BOT: PacingMode.ADAPTIVE})
+        self.ponderer = Ponderer()
+        # Set by automated drivers: messages are logged, not shown modally
+        self.headless = False
+        
+        self._game_ui_built = False
+        
         self._setup_css()
         self._build_ui()
         self.show_menu()
         
-        self.connect("destroy", Gtk.main_quit)
-        self.show_all()
+        if standalone:
+            self.connect("destroy", Gtk.main_quit)
+            self.show_all()
+    
+    @property
+    def active_numbers(self):
+        """The sorted board; change it through self.position.add()"""
+        return self.position.numbers
+    
+    @active_numbers.setter
+    def active_numbers(self, numbers):
+        self.position = self.rule.new_position(numbers)
+    
+    @property
+    def bot(self):
+        """The bot opponent, created the first time it is needed"""
+        if self._bot is None:
+            self._bot = Bot(self.difficulty, self.rule.name)
+        return self._bot
+    
+    @bot.setter
+    def bot(self, bot):
+        if self._bot is not None and self._bot is not bot:
+            self._bot.close()
+        self._bot = bot
+    
+    def quit(self):
+        """Stop timers and background workers before the activity closes"""
+        self.pacer.cancel()
+        self.ponderer.cancel()
+        if self._bot is not None:
+            self._bot.close()
     
     def _setup_css(self):
-        css_provider = Gtk.CssProvider()
-        css = b"""
-        #menu_box {
-            background-color: #f0f0f0;
-            padding: 20px;
-        }
-        
-        #game_box {
-            background-color: #ffffff;
-        }
-        
-        .number_button {
-            font-size: 14pt;
-            min-width: 50px;
-            min-height: 40px;
-            margin: 2px;
-        }
-        
-        .number_button_active {
-            background-color: #4CAF50;
-            color: white;
-        }
-        
-        .number_button_selected {
-            background-color: #2196F3;
-            color: white;
-        }
-        
-        .info_label {
-            font-size: 16pt;
-            font-weight: bold;
-            padding: 10px;
-        }
-        
-        .turn_label {
-            font-size: 14pt;
-            padding: 5px;
-        }
-        
-        .history_label {
-            font-size: 10pt;
-            padding: 2px;
-        }
-
-        .player1_move {
-            color: #d32f2f;  /* Red for player 1 */
-            font-weight: bold;
-        }
-        
-        .player2_move {
-            color: #1976d2;  /* Blue for player 2 */
-            font-weight: bold;
-        }
-        
-        .number_button:disabled {
-            opacity: 0.6;
-        }
-        """
-        css_provider.load_from_data(css)
-        Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(),
-            css_provider,
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
+        add_provider_for_screen(GAME_CSS)
     
     def _build_ui(self):
         self.main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
@@ -185,11 +282,16 @@ class Game(Gtk.Window):
         self.game_box.set_name("game_box")
         
         self._build_menu()
-        self._build_game_ui()
+    
+    def _ensure_game_ui(self):
+        """Build the game screen the first time it is needed"""
+        if not self._game_ui_built:
+            self._game_ui_built = True
+            self._build_game_ui()
     
     def _build_menu(self):
         title = Gtk.Label(label="Euclid's Game")
-        title.get_style_context().add_class("info_label")
+        set_style_classes(title, ["info_label"])
         self.menu_box.pack_start(title, False, False, 0)
         
         mode_label = Gtk.Label(label="Select Game Mode:")
@@ -220,15 +322,39 @@ class Game(Gtk.Window):
         self.expert_radio = Gtk.RadioButton.new_with_label_from_widget(
             self.easy_radio, "Expert"
         )
+        self.master_radio = Gtk.RadioButton.new_with_label_from_widget(
+            self.easy_radio, "Master"
+        )
         self.medium_radio.set_active(True)
         
         diff_button_box.pack_start(self.easy_radio, False, False, 0)
         diff_button_box.pack_start(self.medium_radio, False, False, 0)
         diff_button_box.pack_start(self.expert_radio, False, False, 0)
+        diff_button_box.pack_start(self.master_radio, False, False, 0)
         self.difficulty_box.pack_start(diff_button_box, False, False, 0)
         
         self.menu_box.pack_start(self.difficulty_box, False, False, 0)
         
+        preset_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        preset_label = Gtk.Label(label="Board:")
+        preset_box.pack_start(preset_label, False, False, 0)
+        self.preset_combo = Gtk.ComboBoxText()
+        for preset, label in BOARD_PRESET_LABELS:
+            self.preset_combo.append(preset, label)
+        self.preset_combo.set_active_id(self.board_preset)
+        preset_box.pack_start(self.preset_combo, False, False, 0)
+        self.menu_box.pack_start(preset_box, False, False, 0)
+        
+        rule_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        rule_label = Gtk.Label(label="Rules:")
+        rule_box.pack_start(rule_label, False, False, 0)
+        self.rule_combo = Gtk.ComboBoxText()
+        for rule in RULES.values():
+            self.rule_combo.append(rule.name, rule.label)
+        self.rule_combo.set_active_id(self.rule.name)
+        rule_box.pack_start(self.rule_combo, False, False, 0)
+        self.menu_box.pack_start(rule_box, False, False, 0)
+        
         start_button = Gtk.Button(label="Start Game")
         start_button.connect("clicked", self.on_start_game)
         self.menu_box.pack_start(start_button, False, False, 20)
@@ -244,9 +370,13 @@ class Game(Gtk.Window):
         header_box.pack_start(back_button, False, False, 0)
         
         self.turn_label = Gtk.Label()
-        self.turn_label.get_style_context().add_class("turn_label")
+        set_style_classes(self.turn_label, ["turn_label"])
         header_box.pack_start(self.turn_label, True, True, 0)
         
+        self.hints_button = Gtk.ToggleButton(label="Show Hints")
+        self.hints_button.connect("toggled", self._on_hints_toggled)
+        header_box.pack_end(self.hints_button, False, False, 0)
+        
         self.connection_status = Gtk.Label()
         self.connection_status.set_markup("<span color='green'>●</span> Connected")
         header_box.pack_end(self.connection_status, False, False, 10)
@@ -259,20 +389,13 @@ class Game(Gtk.Window):
         left_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
         
         board_label = Gtk.Label(label="Number Board")
-        board_label.get_style_context().add_class("info_label")
+        set_style_classes(board_label, ["info_label"])
         left_box.pack_start(board_label, False, False, 0)
         
-        scrolled = Gtk.ScrolledWindow()
-        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
-        scrolled.set_min_content_width(400)
-        
-        self.numbers_grid = Gtk.FlowBox()
-        self.numbers_grid.set_valign(Gtk.Align.START)
-        self.numbers_grid.set_max_children_per_line(10)
-        self.numbers_grid.set_selection_mode(Gtk.SelectionMode.NONE)
-        scrolled.add(self.numbers_grid)
-        
-        left_box.pack_start(scrolled, True, True, 0)
+        self.board = BoardView()
+        self.board.set_size_request(400, -1)
+        self.board.connect("number-clicked", self.on_number_clicked)
+        left_box.pack_start(self.board, True, True, 0)
         
         self.selection_label = Gtk.Label()
         self.selection_label.set_markup("<b>Selection:</b> None")
@@ -281,11 +404,18 @@ class Game(Gtk.Window):
         self.calculation_label = Gtk.Label()
         left_box.pack_start(self.calculation_label, False, False, 0)
         
+        self.keyboard_label = Gtk.Label()
+        left_box.pack_start(self.keyboard_label, False, False, 0)
+        
+        self.keyboard = KeyboardInput(self.board, self._on_keyboard_pick,
+                                      self._on_keyboard_update)
+        self.game_box.connect("key-press-event", self._on_game_key_press)
+        
         right_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
         right_box.set_margin_left(10)
         
         info_label = Gtk.Label(label="Game Info")
-        info_label.get_style_context().add_class("info_label")
+        set_style_classes(info_label, ["info_label"])
         right_box.pack_start(info_label, False, False, 0)
         
         self.stats_label = Gtk.Label()
@@ -300,32 +430,64 @@ class Game(Gtk.Window):
         history_scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         history_scrolled.set_min_content_height(200)
         
-        self.history_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
-        history_scrolled.add(self.history_box)
+        # Moves are rows in a list model rather than one label widget
+        # each; with fixed-height mode the view only measures and draws
+        # the rows that are actually scrolled into sight.
+        self.history_store = Gtk.ListStore(str, str)
+        self.history_view = Gtk.TreeView(model=self.history_store)
+        self.history_view.set_headers_visible(False)
+        self.history_view.set_enable_search(False)
+        
+        renderer = Gtk.CellRendererText()
+        renderer.set_property("size-points", 10)
+        renderer.set_property("weight", Pango.Weight.BOLD)
+        column = Gtk.TreeViewColumn("Move", renderer, text=0, foreground=1)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        self.history_view.append_column(column)
+        self.history_view.set_fixed_height_mode(True)
+        
+        history_scrolled.add(self.history_view)
         right_box.pack_start(history_scrolled, True, True, 0)
         
+        # Only shown while watching a replay, see open_replay()
+        self.replay_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        self.replay_box.set_no_show_all(True)
+        self.replay_label = Gtk.Label()
+        self.replay_box.pack_start(self.replay_label, False, False, 0)
+        self.replay_scale = Gtk.Scale.new_with_range(
+            Gtk.Orientation.HORIZONTAL, 0, 1, 1)
+        self.replay_scale.set_digits(0)
+        self.replay_scale.connect("value-changed", self._on_replay_scale_changed)
+        self.replay_box.pack_start(self.replay_scale, False, False, 0)
+        self.replay_label.show()
+        self.replay_scale.show()
+        right_box.pack_start(self.replay_box, False, False, 0)
+        
         game_paned.pack1(left_box, True, False)
         game_paned.pack2(right_box, False, False)
         game_paned.set_position(500)
     
     def show_menu(self):
+        self.pacer.cancel()
+        self.ponderer.cancel()
+        self._close_replay()
         for child in self.main_box.get_children():
             self.main_box.remove(child)
         self.main_box.pack_start(self.menu_box, True, True, 0)
         self.main_box.show_all()
     
     def show_game(self):
+        self._ensure_game_ui()
         for child in self.main_box.get_children():
             self.main_box.remove(child)
         self.main_box.pack_start(self.game_box, True, True, 0)
-        
-        if hasattr(self, 'connection_status'):
-            if self.game_mode == GameMode.NETWORK_MULTIPLAYER:
-                self.connection_status.show()
-            else:
-                self.connection_status.hide()
-        
         self.main_box.show_all()
+        self.board.grab_focus()
+        
+        if self.game_mode == GameMode.NETWORK_MULTIPLAYER:
+            self.connection_status.show()
+        else:
+            self.connection_status.hide()
     
     def on_mode_changed(self, widget):
         if self.vs_bot_radio.get_active():
@@ -334,15 +496,19 @@ class Game(Gtk.Window):
             self.difficulty_box.hide()
     
     def on_start_game(self, widget):
+        self.board_preset = self.preset_combo.get_active_id() or 'classic'
+        self.rule = get_rule(self.rule_combo.get_active_id())
         if self.vs_bot_radio.get_active():
             self.game_mode = GameMode.VS_BOT
             if self.easy_radio.get_active():
                 self.difficulty = Difficulty.EASY
             elif self.medium_radio.get_active():
                 self.difficulty = Difficulty.MEDIUM
+            elif self.master_radio.get_active():
+                self.difficulty = Difficulty.MASTER
             else:
                 self.difficulty = Difficulty.EXPERT
-            self.bot = Bot(self.difficulty)
+            self.bot = Bot(self.difficulty, self.rule.name)
             self.reset_game()
             self.show_game()
         elif self.vs_human_radio.get_active():
@@ -377,12 +543,10 @@ class Game(Gtk.Window):
             self.my_player_number = 1
             self.game_started = True
             
-            num1 = random.randint(20, 40)
-            num2 = random.randint(60, 80)
-            
             initial_state = {
                 'action': 'game_start',
-                'active_numbers': [num1, num2],
+                'rule': self.rule.name,
+                'active_numbers': self._generate_position(),
                 'current_player': 1,
                 'host_player': 1,
                 'guest_player': 2
@@ -399,54 +563,141 @@ class Game(Gtk.Window):
             import traceback
             traceback.print_exc()
 
-    def reset_game(self):
+    def reset_game(self, numbers=None):
+        self._setup_board(numbers)
+        self._start_checkpoints()
+        self.queue_refresh()
+        self._prepare_bot()
+        if self.check_game_over():
+            # No first move: as if the other player had just moved
+            self.handle_game_over(2 if self.current_player == 1 else 1)
+            return
+        self._start_pondering()
+    
+    def _setup_board(self, numbers=None):
+        """Clear the game and lay out a new board, generated if not given"""
+        self.pacer.cancel()
+        self.ponderer.cancel()
+        self._close_replay()
         self.active_numbers = []
         self.selected_numbers = []
         self.current_player = 1
         self.game_over = False
         self.winner = None
         self.move_history = []
+        self._started_at = time.time()
         
-        for child in self.numbers_grid.get_children():
-            self.numbers_grid.remove(child)
-        
-        for child in self.history_box.get_children():
-            self.history_box.remove(child)
+        self._ensure_game_ui()
+        self.history_store.clear()
+        self.keyboard.clear()
         
-        num1 = random.randint(20, 40)
-        num2 = random.randint(60, 80)
-        self.active_numbers = [num1, num2]
+        if numbers:
+            self.position_seed = None
+            self.active_numbers = sorted(numbers)
+        else:
+            self.active_numbers = self._generate_position()
+    
+    def _generate_position(self):
+        """Draw a starting position for the selected board preset"""
+        if self._seed_sequence is None:
+            seed = os.environ.get(SEED_ENV)
+            try:
+                seed = int(seed) if seed else None
+            except ValueError:
+                print(f"ERROR: Ignoring {SEED_ENV}={seed!r}, not an integer")
+                seed = None
+            self._seed_sequence = random.Random(seed)
+        
+        for _ in range(OPENING_ATTEMPTS):
+            self.position_seed = self._seed_sequence.randrange(2 ** 32)
+            generator = get_generator(self.board_preset, seed=self.position_seed)
+            numbers = self.rule.opening(generator.generate(),
+                                        random.Random(self.position_seed))
+            # Some rules can turn an opening into one with no move
+            if not self.rule.new_position(numbers).is_over():
+                break
+        else:
+            print(f"ERROR: No playable {self.rule.name} opening in "
+                  f"{OPENING_ATTEMPTS} attempts")
+        return numbers
+    
+    def queue_refresh(self, *parts):
+        """Mark parts of the UI as stale and redraw them on the next idle.
+
+        Any number of invalidations made while handling one event are
+        coalesced into a single update per part, run before GTK lays out
+        and paints the next frame.  With no arguments every part is marked.
+        """
+        self._dirty.update(parts or REFRESH_ALL)
+        if self._refresh_id is None:
+            self._refresh_id = GLib.idle_add(self._flush_refresh,
+                                             priority=GLib.PRIORITY_HIGH_IDLE)
+    
+    @property
+    def refresh_pending(self):
+        return self._refresh_id is not None
+    
+    def flush_refresh(self):
+        """Run any pending UI updates right away"""
+        if self._refresh_id is not None:
+            GLib.source_remove(self._refresh_id)
+            self._flush_refresh()
+    
+    def _flush_refresh(self):
+        self._refresh_id = None
+        self._ensure_game_ui()
+        dirty = self._dirty
+        self._dirty = set()
         
-        self.update_board()
-        self.update_turn_label()
-        self.update_stats()
+        if REFRESH_BOARD in dirty:
+            self.update_board()
+        if REFRESH_SELECTION in dirty:
+            self.update_selection_display()
+        if REFRESH_STATS in dirty:
+            self.update_stats()
+        if REFRESH_TURN in dirty:
+            self.update_turn_label()
+        return False
     
     def update_board(self):
         print(f"DEBUG: update_board() - current_player={self.current_player}, my_player={self.my_player_number}, mode={self.game_mode}")
         
-        for child in self.numbers_grid.get_children():
-            self.numbers_grid.remove(child)
+        self.board.set_numbers(self.active_numbers)
+        self.board.set_selection(self.selected_numbers)
+        self.board.set_hints(self._hint_for_selection())
+        # Only rules with a closed form can tell who wins
+        self.hints_button.set_sensitive(self.position.closed_form)
+        self.board.set_interactive(self.replay is None and (
+            self.game_mode != GameMode.NETWORK_MULTIPLAYER or
+            self.current_player == self.my_player_number
+        ))
+        self.keyboard.set_numbers(self.active_numbers)
+    
+    def _hint_for_selection(self):
+        """Return the board hint function for the current selection"""
+        position = self.position
+        if (not self.show_hints or not position.closed_form or
+                len(self.selected_numbers) != 1):
+            return None
         
-        for i in range(1, 101):
-            if i in self.active_numbers:
-                button = Gtk.Button(label=str(i))
-                button.get_style_context().add_class("number_button")
-                button.get_style_context().add_class("number_button_active")
-                
-                if i in self.selected_numbers:
-                    button.get_style_context().add_class("number_button_selected")
-                
-                if (self.game_mode == GameMode.NETWORK_MULTIPLAYER and 
-                    self.current_player != self.my_player_number):
-                    button.set_sensitive(False)
-                
-                button.connect("clicked", self.on_number_clicked, i)
-                self.numbers_grid.add(button)
+        selected = self.selected_numbers[0]
+        # The outcome is the same for every legal move, so it is worked
+        # out once; the board only asks about the cells it paints.
+        wins = position.mover_wins()
         
-        self.numbers_grid.show_all()
+        def hint(number):
+            if (number != selected and
+                    position.result_of(number, selected) in position.legal):
+                return wins
+            return None
+        return hint
     
-    def on_number_clicked(self, button, number):
-        if self.game_over:
+    def _on_hints_toggled(self, button):
+        self.show_hints = button.get_active()
+        self.queue_refresh(REFRESH_BOARD, REFRESH_STATS)
+    
+    def on_number_clicked(self, board, number):
+        if self.game_over or self.replay is not None:
             return
         
         if self.current_player == 2 and self.game_mode == GameMode.VS_BOT:
@@ -455,47 +706,71 @@ class Game(Gtk.Window):
         if number in self.selected_numbers:
             self.selected_numbers.remove(number)
         else:
-            if len(self.selected_numbers) < 2:
+            if len(self.selected_numbers) < self.position.arity:
                 self.selected_numbers.append(number)
         
-        self.update_board()
-        self.update_selection_display()
+        self.queue_refresh(REFRESH_BOARD, REFRESH_SELECTION)
         
-        if len(self.selected_numbers) == 2:
+        if len(self.selected_numbers) == self.position.arity:
             self.make_move()
     
+    def _on_game_key_press(self, widget, event):
+        return self.keyboard.handle_key(event)
+    
+    def _on_keyboard_pick(self, number):
+        if self.board.is_interactive():
+            self.on_number_clicked(self.board, number)
+    
+    def _on_keyboard_update(self, text, candidate, count):
+        if not text:
+            self.keyboard_label.set_text("")
+        elif count is None:
+            self.keyboard_label.set_markup(f"<b>Typing:</b> {text}")
+        elif candidate is None:
+            self.keyboard_label.set_markup(
+                f"<b>Typing:</b> {text} <span color='red'>(no match)</span>")
+        else:
+            self.keyboard_label.set_markup(
+                f"<b>Typing:</b> {text} → {candidate} ({count} matching)")
+    
     def update_selection_display(self):
         if not self.selected_numbers:
             self.selection_label.set_markup("<b>Selection:</b> None")
             self.calculation_label.set_text("")
-        elif len(self.selected_numbers) == 1:
-            self.selection_label.set_markup(f"<b>Selection:</b> {self.selected_numbers[0]}")
+        elif len(self.selected_numbers) < self.position.arity:
+            numbers = ", ".join(str(n) for n in self.selected_numbers)
+            self.selection_label.set_markup(f"<b>Selection:</b> {numbers}")
             self.calculation_label.set_text("")
         else:
-            num1, num2 = self.selected_numbers
-            diff = abs(num1 - num2)
-            self.selection_label.set_markup(f"<b>Selection:</b> {num1}, {num2}")
+            selection = self.selected_numbers
+            diff = self.position.result_of(*selection)
+            numbers = ", ".join(str(n) for n in selection)
+            self.selection_label.set_markup(f"<b>Selection:</b> {numbers}")
+            text = self.rule.describe(selection, diff)
             
-            if diff in self.active_numbers:
+            if diff in self.position:
                 self.calculation_label.set_markup(
-                    f"<span color='red'>{num1} - {num2} = {diff} (Already exists!)</span>"
+                    f"<span color='red'>{text} (Already exists!)</span>"
+                )
+            elif not self.position.is_legal(*selection):
+                self.calculation_label.set_markup(
+                    f"<span color='red'>{text} (Not allowed)</span>"
                 )
             else:
                 self.calculation_label.set_markup(
-                    f"<span color='green'>{num1} - {num2} = {diff} ✓</span>"
+                    f"<span color='green'>{text} ✓</span>"
                 )
     
     def make_move(self):
-        if len(self.selected_numbers) != 2:
+        if len(self.selected_numbers) != self.position.arity:
             return False
         
-        num1, num2 = self.selected_numbers
-        diff = abs(num1 - num2)
+        selection = list(self.selected_numbers)
+        diff = self.position.result_of(*selection)
         
-        if diff in self.active_numbers:
+        if not self.position.is_legal(*selection):
             self.selected_numbers = []
-            self.update_board()
-            self.update_selection_display()
+            self.queue_refresh(REFRESH_BOARD, REFRESH_SELECTION)
             return False
         
         if (self.game_mode == GameMode.NETWORK_MULTIPLAYER and 
@@ -503,37 +778,21 @@ class Game(Gtk.Window):
             print("Not your turn!")
             return False
 
-        print(f"DEBUG: Making move - Player {self.current_player}: {num1} - {num2} = {diff}")
+        print(f"DEBUG: Making move - Player {self.current_player}: {self.rule.describe(selection, diff)}")
 
-        self.active_numbers.append(diff)
-        self.active_numbers.sort()
-        
-        move_text = f"Player {self.current_player}: {num1} - {num2} = {diff}"
-        move_data = {
-            'player': self.current_player,
-            'num1': num1,
-            'num2': num2,
-            'diff': diff
-        }
-        self.move_history.append(move_data)
+        self.position.add(diff)
         
-        history_label = Gtk.Label(label=move_text)
-        history_label.get_style_context().add_class("history_label")
-        history_label.get_style_context().add_class(f"player{self.current_player}_move")
-        history_label.set_halign(Gtk.Align.START)
-        self.history_box.pack_start(history_label, False, False, 0)
-        self.history_box.show_all()
+        self.keyboard.add_number(diff)
+        
+        move_data = self._move_data(self.current_player, selection, diff)
+        self.move_history.append(move_data)
+        self._append_history(move_data)
+        self._checkpoint_move(self.current_player, selection, diff)
         
         if self.game_mode == GameMode.NETWORK_MULTIPLAYER:
             if self._collab:
-                move_message = {
-                    'action': 'move',
-                    'player': self.current_player,
-                    'num1': num1,
-                    'num2': num2,
-                    'diff': diff,
-                    'active_numbers': self.active_numbers.copy()
-                }
+                move_message = dict(move_data, action='move',
+                                    active_numbers=self.active_numbers.copy())
                 print(f"DEBUG: Sending move message: {move_message}")
                 try:
                     self._collab.post(move_message)
@@ -544,18 +803,17 @@ class Game(Gtk.Window):
                 print("ERROR: No collab wrapper available to send move!")
         
         self.selected_numbers = []
-        self.update_board()
-        self.update_selection_display()
-        self.update_stats()
+        self.queue_refresh()
         
         if self.check_game_over():
             self.handle_game_over()
         else:
             self.current_player = 2 if self.current_player == 1 else 1
-            self.update_turn_label()
             
             if self.current_player == 2 and self.game_mode == GameMode.VS_BOT:
-                GLib.timeout_add(1000, self.bot_move)
+                self.pacer.schedule(self.game_mode, 0, self.bot_move)
+            else:
+                self._start_pondering()
         
         return True
     
@@ -563,26 +821,67 @@ class Game(Gtk.Window):
         if self.game_over:
             return False
         
-        move = self.bot.get_move({'active_numbers': self.active_numbers})
-        if move:
-            self.selected_numbers = list(move)
-            self.update_board()
-            self.update_selection_display()
-            GLib.timeout_add(500, self.make_move)
+        start = time.monotonic()
+        move = None
+        if self.move_history:
+            move = self.ponderer.take(self.position,
+                                      self.move_history[-1]['diff'])
+        if move is not None and self.position.is_legal(*move):
+            self._bot_move_found(move, start)
+        else:
+            # Searched in idle slices, so the UI keeps running meanwhile
+            self.ponderer.answer(self.bot, self.position,
+                                 lambda move: self._bot_move_found(move, start))
         
         return False
     
+    def _bot_move_found(self, move, start):
+        think_time = time.monotonic() - start
+        if move and not self.game_over:
+            self.pacer.schedule(self.game_mode, BOT_THINK_DELAY,
+                                self._show_bot_move, move,
+                                think_time=think_time)
+    
+    def _prepare_bot(self):
+        """Start a Master bot's workers as soon as its game begins"""
+        if self.game_mode == GameMode.VS_BOT and self.bot.can_think:
+            # After the board has been drawn, ahead of the pondering
+            GLib.idle_add(self._prepare_bot_cb,
+                          priority=GLib.PRIORITY_DEFAULT_IDLE)
+    
+    def _prepare_bot_cb(self):
+        if self.game_mode == GameMode.VS_BOT and not self.game_over:
+            self.bot.prepare()
+        return False
+    
+    def _start_pondering(self):
+        """Let the bot work on its replies while the human is thinking"""
+        if (self.game_mode == GameMode.VS_BOT and self.current_player == 1 and
+                not self.game_over and self.replay is None):
+            self.ponderer.start(self.bot, self.position)
+    
+    def _show_bot_move(self, move):
+        """Preview the bot's selection, then play it"""
+        if self.game_over:
+            return
+        self.selected_numbers = list(move)
+        self.queue_refresh(REFRESH_BOARD, REFRESH_SELECTION)
+        self.pacer.schedule(self.game_mode, BOT_PREVIEW_DELAY, self.make_move)
+    
     def check_game_over(self):
-        for i in range(len(self.active_numbers)):
-            for j in range(i + 1, len(self.active_numbers)):
-                diff = abs(self.active_numbers[i] - self.active_numbers[j])
-                if diff not in self.active_numbers:
-                    return False
-        return True
+        return self.position.is_over()
     
-    def handle_game_over(self):
+    def handle_game_over(self, last_player=None):
+        """End the game; last_player, by default current_player, moved last"""
+        if self.game_over:
+            # Already archived and logged as over
+            return
         self.game_over = True
-        self.winner = 2 if self.current_player == 1 else 1
+        if last_player is None:
+            last_player = self.current_player
+        self.winner = self.position.winner(last_player)
+        self._archive_game()
+        self._end_checkpoints(self.winner)
         
         if self.game_mode == GameMode.NETWORK_MULTIPLAYER and self._collab:
             self._collab.post({
@@ -591,14 +890,9 @@ class Game(Gtk.Window):
                 'final_state': self.active_numbers.copy()
             })
         
-        dialog = Gtk.MessageDialog(
-            parent=self,
-            flags=0,
-            message_type=Gtk.MessageType.INFO,
-            buttons=Gtk.ButtonsType.OK,
-            text="Game Over!"
-        )
-        
+        self._show_game_over()
+    
+    def _show_game_over(self):
         if self.game_mode == GameMode.VS_BOT:
             if self.winner == 1:
                 message = "Congratulations! You won!"
@@ -613,12 +907,251 @@ class Game(Gtk.Window):
                 opponent_name = self.opponent_buddy.props.nick if self.opponent_buddy else "Opponent"
                 message = f"{opponent_name} wins!"
         
-        dialog.format_secondary_text(message)
-        dialog.run()
-        dialog.destroy()
+        self._show_message("Game Over!", message)
         
         self.show_menu()
     
+    def _archive_game(self):
+        """Queue the finished game for the local archive"""
+        if self.archive is None or not self.move_history:
+            return
+        
+        moves = [move['diff'] for move in self.move_history]
+        played = set(moves)
+        opening = [n for n in self.active_numbers if n not in played]
+        names = self._player_names()
+        difficulty = (self.difficulty.value
+                      if self.game_mode == GameMode.VS_BOT else None)
+        try:
+            self.archive.record(self._started_at or time.time(), time.time(),
+                                self.game_mode.value, difficulty,
+                                self.rule.name, names[1], names[2],
+                                self.winner, opening, board_gcd(opening),
+                                moves)
+        except Exception as e:
+            print(f"ERROR: Failed to archive game: {e}")
+    
+    def _player_names(self):
+        if self.game_mode == GameMode.VS_BOT:
+            return {1: self._get_my_nick(),
+                    2: f"Bot ({self.difficulty.name.title()})"}
+        if self.game_mode == GameMode.NETWORK_MULTIPLAYER:
+            me = self._get_my_nick()
+            opponent = self.opponent_buddy.props.nick if self.opponent_buddy else "Opponent"
+            if self.my_player_number == 1:
+                return {1: me, 2: opponent}
+            return {1: opponent, 2: me}
+        return {1: "Player 1", 2: "Player 2"}
+    
+    def _start_checkpoints(self, new_game=True):
+        """Begin the checkpoint log again from the current board
+        
+        A new game gets a new id; a resumed one keeps the id saved in
+        the journal, which is how the log is matched to it later.
+        """
+        if self.checkpoints is None:
+            return
+        if new_game or self.checkpoint_id is None:
+            self.checkpoint_id = random.getrandbits(32)
+        difficulty = (self.difficulty.value
+                      if self.game_mode == GameMode.VS_BOT else None)
+        try:
+            self.checkpoints.start(self.checkpoint_id, self.game_mode.value,
+                                   self.rule.name, difficulty,
+                                   self.current_player,
+                                   len(self.move_history),
+                                   self.active_numbers)
+        except OSError as e:
+            print(f"ERROR: Failed to start checkpoint log: {e}")
+            self.checkpoints = None
+    
+    def _checkpoint_move(self, player, selection, diff):
+        if self.checkpoints is None or self.replay is not None:
+            return
+        try:
+            self.checkpoints.move(player, selection, diff)
+        except OSError as e:
+            print(f"ERROR: Failed to checkpoint move: {e}")
+            self.checkpoints = None
+    
+    def _end_checkpoints(self, winner):
+        if self.checkpoints is None:
+            return
+        try:
+            self.checkpoints.end(winner)
+        except OSError as e:
+            print(f"ERROR: Failed to end checkpoint log: {e}")
+            self.checkpoints = None
+    
+    def resume_checkpoints(self, log):
+        """Continue the checkpoint log after load_state()
+        
+        log is the checkpoint.CheckpointGame read at startup, or None.
+        When it belongs to the loaded game, the moves played after the
+        journal was last written are replayed.  An unfinished game with
+        another id was started after the journal's game was saved, as
+        the log restarts with every game, so it is restored in its
+        place.  The log then starts again from the resulting board.
+        """
+        if (log is not None and not log.ended and log.numbers and
+                log.mode != GameMode.NETWORK_MULTIPLAYER.value):
+            if log.game_id == self.checkpoint_id:
+                missing = log.base_moves + len(log.moves) - len(self.move_history)
+                if 0 < missing <= len(log.moves):
+                    self._replay_checkpoint_moves(log.moves[-missing:])
+            elif self.active_numbers and self.checkpoint_id is None:
+                # Saved without checkpoints, or while watching a replay:
+                # there is no telling which game is newer
+                print(f"WARNING: Dropping checkpointed game with {len(log.moves)} "
+                      f"moves, the journal game has no checkpoint id")
+            else:
+                if self.active_numbers:
+                    print("WARNING: Journal game is older than the checkpoint log")
+                print(f"DEBUG: Restoring unsaved game with {len(log.moves)} moves")
+                self.load_state({
+                    'game_mode': log.mode,
+                    'difficulty': log.difficulty or Difficulty.MEDIUM.value,
+                    'rule': log.rule or DEFAULT_RULE,
+                    'active_numbers': log.numbers,
+                    'current_player': log.current_player,
+                })
+                self.checkpoint_id = log.game_id
+                self._replay_checkpoint_moves(log.moves)
+        
+        if self.active_numbers and not self.game_over and (
+                self.game_mode != GameMode.NETWORK_MULTIPLAYER):
+            self._start_checkpoints(new_game=False)
+    
+    def _replay_checkpoint_moves(self, moves):
+        self.pacer.cancel()
+        self.ponderer.cancel()
+        last_player = None
+        for player, selection, diff in moves:
+            if (len(selection) != self.position.arity or
+                    self.position.result_of(*selection) != diff or
+                    not self.position.is_legal(*selection)):
+                print(f"ERROR: Checkpoint move {selection} -> {diff} is not legal here")
+                break
+            self.position.add(diff)
+            self.move_history.append(self._move_data(player, selection, diff))
+            last_player = player
+            self.current_player = 2 if player == 1 else 1
+        print(f"DEBUG: Replayed {len(moves)} checkpointed moves")
+        
+        self.selected_numbers = []
+        self._load_history(self.move_history)
+        self.queue_refresh()
+        
+        if self.check_game_over() and last_player is not None:
+            # The game ended before the END record reached the disk
+            self.current_player = last_player
+            self.game_over = True
+            # The same winner handle_game_over() would have recorded
+            self.winner = self.position.winner(last_player)
+            self.show_menu()
+        elif self.current_player == 2 and self.game_mode == GameMode.VS_BOT:
+            self.pacer.schedule(self.game_mode, BOT_RESUME_DELAY, self.bot_move)
+        else:
+            self._start_pondering()
+    
+    def _move_data(self, player, selection, diff):
+        """History entry for a move; 'diff' is the number it added"""
+        move = {'player': player, 'num1': selection[0], 'num2': selection[1]}
+        if len(selection) > 2:
+            move['num3'] = selection[2]
+        move['diff'] = diff
+        return move
+    
+    def _history_row(self, move):
+        selection = [move['num1'], move['num2']]
+        if 'num3' in move:
+            selection.append(move['num3'])
+        text = f"Player {move['player']}: {self.rule.describe(selection, move['diff'])}"
+        return [text, PLAYER_COLORS.get(move['player'], '#000000')]
+    
+    def _append_history(self, move):
+        """Append one move to the history panel and keep it in view"""
+        tree_iter = self.history_store.append(self._history_row(move))
+        self.history_view.scroll_to_cell(
+            self.history_store.get_path(tree_iter), None, False, 0, 0)
+    
+    def _load_history(self, moves):
+        """Replace the history panel contents with the given moves"""
+        # Detach the model while filling it so the view does not react
+        # to every single row insertion.
+        self.history_view.set_model(None)
+        self.history_store.clear()
+        for move in moves:
+            self.history_store.append(self._history_row(move))
+        self.history_view.set_model(self.history_store)
+        
+        if len(self.history_store):
+            self.history_view.scroll_to_cell(
+                Gtk.TreePath(len(self.history_store) - 1), None, False, 0, 0)
+    
+    def open_replay(self, game, move=None):
+        """Watch a replay.ReplayGame, starting after `move` moves"""
+        # Archives hold games of the difference rule
+        self.rule = get_rule(DEFAULT_RULE)
+        if hasattr(self, 'rule_combo'):
+            self.rule_combo.set_active_id(self.rule.name)
+        # The checkpoint log is left alone: it still holds the last game
+        # played, and the replay is already on disk
+        self._setup_board(game.numbers)
+        self.checkpoint_id = None
+        self.game_mode = GameMode.LOCAL_MULTIPLAYER
+        self.replay = ReplayCursor(game)
+        # One pass over the game; seeking only slices this list
+        self._replay_moves = list(to_moves(game))
+        
+        self.replay_scale.set_range(0, max(1, len(self.replay)))
+        self.replay_box.show()
+        self.show_game()
+        
+        move = len(self.replay) if move is None else move
+        if int(self.replay_scale.get_value()) == move:
+            self.seek_replay(move)
+        else:
+            self.replay_scale.set_value(move)
+    
+    def seek_replay(self, move):
+        """Show the replayed game as it was after `move` moves"""
+        if self.replay is None:
+            return
+        
+        self.position = self.replay.seek(move)
+        move = self.replay.move
+        self.selected_numbers = []
+        self.current_player = self.replay.current_player
+        self.game_over = self.position.is_over()
+        last_player = 2 if self.current_player == 1 else 1
+        self.winner = self.position.winner(last_player) if self.game_over else None
+        
+        # Only the rows between the old and the new move are touched
+        shown = len(self.history_store)
+        if move < shown:
+            for _ in range(shown - move):
+                self.history_store.remove(
+                    self.history_store.get_iter(Gtk.TreePath(len(self.history_store) - 1)))
+        for entry in self._replay_moves[shown:move]:
+            self.history_store.append(self._history_row(entry))
+        if move:
+            self.history_view.scroll_to_cell(Gtk.TreePath(move - 1), None, False, 0, 0)
+        self.move_history = self._replay_moves[:move]
+        
+        self.replay_label.set_markup(f"<b>Replay:</b> move {move} of {len(self.replay)}")
+        self.queue_refresh()
+    
+    def _on_replay_scale_changed(self, scale):
+        self.seek_replay(int(scale.get_value()))
+    
+    def _close_replay(self):
+        if self.replay is None:
+            return
+        self.replay = None
+        self._replay_moves = []
+        self.replay_box.hide()
+    
     def update_turn_label(self):
         if self.game_mode == GameMode.VS_BOT:
             if self.current_player == 1:
@@ -639,16 +1172,18 @@ class Game(Gtk.Window):
         stats_text = f"""Active Numbers: {len(self.active_numbers)}
 Moves Made: {len(self.move_history)}
 Valid Moves Left: {valid_moves}"""
+        if (self.show_hints and self.position.closed_form and
+                not self.position.is_over()):
+            if self.position.mover_wins():
+                verdict = "every move wins"
+            else:
+                verdict = "every move loses"
+            stats_text += f"""
+Hint: {self.position.moves_left()} moves to go, {verdict}"""
         self.stats_label.set_text(stats_text)
     
     def count_valid_moves(self):
-        count = 0
-        for i in range(len(self.active_numbers)):
-            for j in range(i + 1, len(self.active_numbers)):
-                diff = abs(self.active_numbers[i] - self.active_numbers[j])
-                if diff not in self.active_numbers:
-                    count += 1
-        return count
+        return self.position.legal_pairs
     
     def save_state(self):
         """Return the current game state as a dictionary"""
@@ -714,12 +1249,27 @@ Valid Moves Left: {valid_moves}"""
                     'num2': int(move.get('num2', 0)),
                     'diff': int(move.get('diff', 0))
                 }
+                if 'num3' in move:
+                    move_data['num3'] = int(move['num3'])
                 state['move_history'].append(move_data)
             json.dumps({'test': state['move_history']})
         except Exception as e:
             print(f"Error with move_history: {e}")
             state['move_history'] = []
         
+        state['rule'] = self.rule.name
+        state['started_at'] = self._started_at
+        state['checkpoint_id'] = self.checkpoint_id
+        
+        try:
+            state['board_preset'] = str(self.board_preset)
+            state['position_seed'] = self.position_seed
+            json.dumps({'test': [state['board_preset'], state['position_seed']]})
+        except Exception as e:
+            print(f"Error with board_preset: {e}")
+            state['board_preset'] = 'classic'
+            state['position_seed'] = None
+        
         try:
             state['show_menu'] = bool(self.show_menu)
             json.dumps({'test': state['show_menu']})
@@ -742,6 +1292,8 @@ Valid Moves Left: {valid_moves}"""
     def load_state(self, state):
         """Load game state from a dictionary"""
         print("DEBUG: Starting load_state")
+        self.pacer.cancel()
+        self.ponderer.cancel()
         print(f"DEBUG: State keys received: {list(state.keys()) if state else 'None'}")
         
         try:
@@ -754,16 +1306,30 @@ Valid Moves Left: {valid_moves}"""
                 print(f"ERROR: Failed to load game_mode: {e}")
                 self.game_mode = GameMode.VS_BOT
             
+            board_preset = state.get('board_preset', 'classic')
+            self.board_preset = board_preset if board_preset in PRESETS else 'classic'
+            self.position_seed = state.get('position_seed')
+            if hasattr(self, 'preset_combo'):
+                self.preset_combo.set_active_id(self.board_preset)
+            
+            self._started_at = state.get('started_at') or time.time()
+            self.checkpoint_id = state.get('checkpoint_id')
+            
+            # Before the numbers, which are indexed for this rule
+            self.rule = get_rule(state.get('rule', DEFAULT_RULE))
+            if hasattr(self, 'rule_combo'):
+                self.rule_combo.set_active_id(self.rule.name)
+            
             try:
                 difficulty_value = state.get('difficulty', Difficulty.MEDIUM.value)
                 print(f"DEBUG: Loading difficulty = {difficulty_value}")
                 self.difficulty = Difficulty(difficulty_value)
-                self.bot = Bot(self.difficulty)
+                self.bot = Bot(self.difficulty, self.rule.name)
                 print(f"DEBUG: Difficulty set to: {self.difficulty}")
             except Exception as e:
                 print(f"ERROR: Failed to load difficulty: {e}")
                 self.difficulty = Difficulty.MEDIUM
-                self.bot = Bot(self.difficulty)
+                self.bot = Bot(self.difficulty, self.rule.name)
             
             try:
                 self.active_numbers = state.get('active_numbers', [])
@@ -816,29 +1382,20 @@ Valid Moves Left: {valid_moves}"""
                 print("DEBUG: Game was in progress, restoring UI")
                 
                 self.show_game()
+                self.queue_refresh()
+                if not self.game_over:
+                    self._prepare_bot()
                 
-                self.update_board()
-                self.update_turn_label()
-                self.update_stats()
-                self.update_selection_display()
-                
-                for child in self.history_box.get_children():
-                    self.history_box.remove(child)
-                
-                for move in self.move_history:
-                    move_text = f"Player {move['player']}: {move['num1']} - {move['num2']} = {move['diff']}"
-                    history_label = Gtk.Label(label=move_text)
-                    history_label.get_style_context().add_class("history_label")
-                    history_label.set_halign(Gtk.Align.START)
-                    self.history_box.pack_start(history_label, False, False, 0)
-                
-                self.history_box.show_all()
+                self._load_history(self.move_history)
                 
                 if (self.current_player == 2 and 
                     self.game_mode == GameMode.VS_BOT and 
                     not self.game_over):
                     print("DEBUG: Scheduling bot move after load")
-                    GLib.timeout_add(1500, self.bot_move)
+                    self.pacer.schedule(self.game_mode, BOT_RESUME_DELAY,
+                                        self.bot_move)
+                else:
+                    self._start_pondering()
             else:
                 print("DEBUG: No game in progress, showing menu")
                 self.show_menu()
@@ -894,16 +1451,9 @@ Valid Moves Left: {valid_moves}"""
         if hasattr(self, 'connection_status'):
             self.connection_status.set_markup("<span color='red'>●</span> Disconnected")
         
-        dialog = Gtk.MessageDialog(
-            parent=self,
-            flags=0,
-            message_type=Gtk.MessageType.WARNING,
-            buttons=Gtk.ButtonsType.OK,
-            text="Opponent Disconnected"
-        )
-        dialog.format_secondary_text("Your opponent has left the game.")
-        dialog.run()
-        dialog.destroy()
+        self._show_message("Opponent Disconnected",
+                           "Your opponent has left the game.",
+                           Gtk.MessageType.WARNING)
         
         self.show_menu()
 
@@ -951,10 +1501,19 @@ Valid Moves Left: {valid_moves}"""
             print(f"DEBUG: Unknown action: {action}")
     
     def _handle_opponent_game_over(self, data):
-        """Handle game over message from opponent"""
+        """Handle game over message from opponent
+        
+        Both peers post one when they see the last move, so this is
+        usually a game already over here; it is never posted back.
+        """
         winner = data.get('winner')
         final_state = data.get('final_state', [])
         
+        if self.game_over:
+            if winner != self.winner:
+                print(f"WARNING: Opponent reports winner {winner}, we have {self.winner}")
+            return
+        
         if sorted(self.active_numbers) != sorted(final_state):
             print("WARNING: Final state mismatch!")
             self.active_numbers = final_state.copy()
@@ -962,17 +1521,18 @@ Valid Moves Left: {valid_moves}"""
         self.game_over = True
         self.winner = winner
         
-        self.handle_game_over()
+        self._show_game_over()
     
     def _handle_opponent_move(self, move_data):
         """Process a move received from the opponent"""
         player = move_data.get('player')
-        num1 = move_data.get('num1')
-        num2 = move_data.get('num2')
+        selection = [move_data.get('num1'), move_data.get('num2')]
+        if 'num3' in move_data:
+            selection.append(move_data.get('num3'))
         diff = move_data.get('diff')
         received_numbers = move_data.get('active_numbers', [])
         
-        print(f"Processing opponent move: {num1} - {num2} = {diff}")
+        print(f"Processing opponent move: {selection} -> {diff}")
         
         if player != self.current_player:
             print(f"ERROR: Received move for player {player} but current player is {self.current_player}")
@@ -982,20 +1542,22 @@ Valid Moves Left: {valid_moves}"""
             print("ERROR: Received move from opponent but it's marked as our move")
             return
         
-        if diff in self.active_numbers:
+        if diff in self.position:
             print(f"ERROR: Invalid move received - {diff} already exists")
             return
         
-        if abs(num1 - num2) != diff:
-            print(f"ERROR: Invalid calculation - {num1} - {num2} != {diff}")
+        if any(number not in self.position for number in selection):
+            print(f"ERROR: Invalid numbers used - {selection} not all in active numbers")
             return
         
-        if num1 not in self.active_numbers or num2 not in self.active_numbers:
-            print(f"ERROR: Invalid numbers used - {num1} or {num2} not in active numbers")
+        if (len(selection) != self.position.arity or
+                self.position.result_of(*selection) != diff or
+                not self.position.is_legal(*selection)):
+            print(f"ERROR: Invalid move - {selection} does not add {diff}")
             return
         
-        self.active_numbers.append(diff)
-        self.active_numbers.sort()
+        self.position.add(diff)
+        self.keyboard.add_number(diff)
         
         if sorted(self.active_numbers) != sorted(received_numbers):
             print("WARNING: State mismatch after move!")
@@ -1003,30 +1565,16 @@ Valid Moves Left: {valid_moves}"""
             print(f"Remote: {sorted(received_numbers)}")
             self.active_numbers = received_numbers.copy()
         
-        move_text = f"Player {player}: {num1} - {num2} = {diff}"
-        move_history_data = {
-            'player': player,
-            'num1': num1,
-            'num2': num2,
-            'diff': diff
-        }
+        move_history_data = self._move_data(player, selection, diff)
         self.move_history.append(move_history_data)
-        
-        history_label = Gtk.Label(label=move_text)
-        history_label.get_style_context().add_class("history_label")
-        history_label.get_style_context().add_class(f"player{player}_move")
-        history_label.set_halign(Gtk.Align.START)
-        self.history_box.pack_start(history_label, False, False, 0)
-        self.history_box.show_all()
-        self.update_stats()
+        self._append_history(move_history_data)
+        self._checkpoint_move(player, selection, diff)
+        self.queue_refresh()
         
         if self.check_game_over():
             self.handle_game_over()
         else:
             self.current_player = 2 if self.current_player == 1 else 1
-            self.update_turn_label()
-            
-            self.update_board()
             
             if self.current_player == self.my_player_number:
                 self._notify_your_turn()
@@ -1036,43 +1584,41 @@ Valid Moves Left: {valid_moves}"""
     
     def _notify_your_turn(self):
         """Notify player it's their turn"""
-        original_markup = self.turn_label.get_markup()
-        
         def flash_on():
-            self.turn_label.set_markup("<span background='#4CAF50' foreground='white'><b>  YOUR TURN!  </b></span>")
+            set_style_classes(self.turn_label, ["turn_label", "turn_flash"])
             GLib.timeout_add(500, flash_off)
             return False
         
         def flash_off():
-            self.turn_label.set_markup(original_markup)
+            set_style_classes(self.turn_label, ["turn_label"])
             return False
         
         GLib.timeout_add(100, flash_on)
+    
     def _init_network_game(self, initial_state):
         """Initialize the network game with given state"""
         print(f"Initializing network game with state: {initial_state}")
         
         self.game_mode = GameMode.NETWORK_MULTIPLAYER
+        self.pacer.cancel()
+        self.ponderer.cancel()
         
+        self.rule = get_rule(initial_state.get('rule', DEFAULT_RULE))
         self.active_numbers = initial_state['active_numbers'].copy()
         self.selected_numbers = []
         self.current_player = initial_state['current_player']
         self.game_over = False
         self.winner = None
         self.move_history = []
+        self._started_at = time.time()
         
-        for child in self.numbers_grid.get_children():
-            self.numbers_grid.remove(child)
-        
-        for child in self.history_box.get_children():
-            self.history_box.remove(child)
+        self._ensure_game_ui()
+        self.history_store.clear()
+        self.keyboard.clear()
         
+        self._start_checkpoints()
         self.show_game()
-        
-        self.update_board()
-        self.update_turn_label()
-        self.update_stats()
-        self.update_selection_display()
+        self.queue_refresh()
         
         if self.is_host:
             self._show_game_start_message("You are Player 1 (Red). You start!")
@@ -1081,12 +1627,20 @@ Valid Moves Left: {valid_moves}"""
     
     def _show_game_start_message(self, message):
         """Show a temporary message when game starts"""
+        self._show_message("Game Started!", message)
+    
+    def _show_message(self, title, message, message_type=Gtk.MessageType.INFO):
+        """Show a modal message dialog, or just log it when headless"""
+        if self.headless:
+            print(f"{title} {message}")
+            return
+        
         dialog = Gtk.MessageDialog(
             parent=self,
             flags=0,
-            message_type=Gtk.MessageType.INFO,
+            message_type=message_type,
             buttons=Gtk.ButtonsType.OK,
-            text="Game Started!"
+            text=title
         )
         dialog.format_secondary_text(message)
         dialog.run()
@@ -1099,6 +1653,7 @@ Valid Moves Left: {valid_moves}"""
         
         return {
             'game_in_progress': True,
+            'rule': self.rule.name,
             'active_numbers': self.active_numbers.copy(),
             'current_player': self.current_player,
             'move_history': self.move_history.copy(),
@@ -1120,6 +1675,6 @@ Valid Moves Left: {valid_moves}"""
 from gi.repository import GLib
 
 if __name__ == "__main__":
-    game = EuclidsGame()
+    game = Game()
     Gtk.main()
     
\ No newline at end of file
@@ -0,0 +1,176 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gdk, GLib
+from bisect import bisect_left, insort
+
+# Delay before a burst of keystrokes updates the highlighted number
+LOOKUP_DEBOUNCE = 80
+
+PICK_KEYS = ('Return', 'KP_Enter', 'space', 'KP_Space', 'comma', 'minus',
+             'KP_Subtract')
+
+
+class NumberIndex:
+    """Board numbers indexed by their decimal text for prefix lookups"""
+
+    def __init__(self, numbers=()):
+        self.reset(numbers)
+
+    def reset(self, numbers):
+        self._keys = sorted(str(number) for number in numbers)
+
+    def add(self, number):
+        insort(self._keys, str(number))
+
+    def lookup(self, prefix):
+        """Return (candidate, exact, count) for numbers starting with prefix.
+
+        The candidate is the first match in text order, exact is the
+        number equal to prefix if it is on the board, and count is the
+        number of matches.  Each lookup is two binary searches.
+        """
+        low = bisect_left(self._keys, prefix)
+        # Every key character is a digit, so this sorts after all matches.
+        high = bisect_left(self._keys, prefix + '\x7f', low)
+        if low == high:
+            return None, None, 0
+
+        first = self._keys[low]
+        exact = int(first) if first == prefix else None
+        return int(first), exact, high - low
+
+
+class KeyboardInput:
+    """Selects board numbers by typing them.
+
+    Digits narrow down the candidate, which is highlighted on the board.
+    Enter, Space, comma or minus picks the typed number, Backspace edits
+    and Escape clears.  Typing "24 66" followed by Enter therefore picks
+    both numbers of a move.
+
+    on_pick(number) is called for every picked number and
+    on_update(text, candidate, count) whenever the typed text changes.
+    """
+
+    def __init__(self, board, on_pick, on_update):
+        self._board = board
+        self._on_pick = on_pick
+        self._on_update = on_update
+        self._index = NumberIndex()
+        self._numbers = []
+        self._size = 0
+        self._stale = False
+        self._text = ''
+        self._lookup_id = None
+
+    def set_numbers(self, numbers):
+        """Note the board numbers
+        
+        Nothing happens if they are the list add_number() kept up to
+        date; otherwise the index is rebuilt on next use.
+        """
+        if numbers is self._numbers and len(numbers) == self._size:
+            return
+        self._numbers = numbers
+        self._size = len(numbers)
+        self._stale = True
+
+    def add_number(self, number):
+        """Note a number played on the board, in O(log n) comparisons"""
+        if not self._stale:
+            self._index.add(number)
+        self._size += 1
+
+    def clear(self):
+        self._cancel_lookup()
+        self._text = ''
+        self._board.set_highlight(None)
+        self._on_update('', None, 0)
+
+    def handle_key(self, event):
+        """Process a key press; return True if it was consumed"""
+        if event.get_state() & (Gdk.ModifierType.CONTROL_MASK |
+                                Gdk.ModifierType.MOD1_MASK):
+            return False
+
+        name = Gdk.keyval_name(event.keyval) or ''
+        char = chr(Gdk.keyval_to_unicode(event.keyval) or 0)
+
+        if char.isdigit() and (self._text or char != '0'):
+            self._text += char
+            self._schedule_lookup()
+            return True
+        if name == 'BackSpace' and self._text:
+            self._text = self._text[:-1]
+            self._schedule_lookup()
+            return True
+        if name == 'Escape' and self._text:
+            self.clear()
+            return True
+        if name in PICK_KEYS and self._text:
+            self._pick()
+            return True
+        return False
+
+    def _schedule_lookup(self):
+        self._on_update(self._text, None, None)
+        self._cancel_lookup()
+        self._lookup_id = GLib.timeout_add(LOOKUP_DEBOUNCE, self._lookup_cb)
+
+    def _cancel_lookup(self):
+        if self._lookup_id is not None:
+            GLib.source_remove(self._lookup_id)
+            self._lookup_id = None
+
+    def _lookup(self):
+        if self._stale:
+            self._index.reset(self._numbers)
+            self._stale = False
+        return self._index.lookup(self._text)
+
+    def _lookup_cb(self):
+        self._lookup_id = None
+        if not self._text:
+            self._board.set_highlight(None)
+            self._on_update('', None, 0)
+            return False
+
+        candidate, exact, count = self._lookup()
+        highlight = exact if exact is not None else candidate
+        self._board.set_highlight(highlight)
+        if highlight is not None:
+            self._board.scroll_to(highlight)
+        self._on_update(self._text, highlight, count)
+        return False
+
+    def _pick(self):
+        self._cancel_lookup()
+        candidate, exact, count = self._lookup()
+        if exact is None and count == 1:
+            exact = candidate
+        if exact is None:
+            # Ambiguous or unknown: keep the text so it can be corrected.
+            self._lookup_cb()
+            return
+
+        self._text = ''
+        self._board.set_highlight(None)
+        self._on_update('', None, 0)
+        self._on_pick(exact)
@@ -0,0 +1,381 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Monte Carlo tree search over the position kernels of any rule variant.
+
+Leaves are picked in batches, with a virtual loss so that one batch
+spreads over the tree, and the random playouts of a batch run on a
+process pool.  The tree below the position that was actually reached
+is kept between moves.  Measure playout throughput for a worker count::
+
+    python3 mcts.py --workers 4 --numbers 24 66 --time 2
+'''
+
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+from rules import DEFAULT_RULE, RULES, get_rule
+
+# Per-move defaults, overridable through MCTSSearch arguments
+TIME_LIMIT = 0.8
+MAX_NODES = 100000
+# Seconds the tree may grow while the opponent is thinking
+THINK_LIMIT = 30.0
+PLAYOUTS_PER_LEAF = 8
+EXPLORATION = 1.4
+LEAVES_PER_WORKER = 16
+
+
+def playout(position, rng=random):
+    '''Play random moves to the end; True if the player to move wins.'''
+    position = position.copy()
+    moved_last = False
+    while position.legal:
+        position.add(rng.choice(list(position.legal)))
+        moved_last = not moved_last
+    return moved_last == position.last_move_wins
+
+
+def run_playouts(rule_name, numbers, count, seed):
+    '''Wins for the player to move in `count` playouts from numbers.'''
+    position = get_rule(rule_name).new_position(numbers)
+    rng = random.Random(seed)
+    return sum(playout(position, rng) for _ in range(count))
+
+
+class Node:
+    __slots__ = ('move', 'parent', 'children', 'untried', 'visits', 'wins')
+
+    def __init__(self, move=None, parent=None):
+        self.move = move
+        self.parent = parent
+        self.children = {}
+        self.untried = None
+        self.visits = 0
+        # From the point of view of the player who played `move`
+        self.wins = 0
+
+    def best_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(self.children.values(),
+                   key=lambda child: child.wins / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+class MCTSSearch:
+    '''
+    A reusable search tree plus the worker pool feeding it.
+
+    `workers` is the number of playout processes (0 runs them in this
+    process), `max_nodes` bounds the tree and `time_limit` the seconds
+    spent per move.  `stats` describes the last search.
+    '''
+
+    def __init__(self, workers=None, time_limit=TIME_LIMIT,
+                 max_nodes=MAX_NODES, playouts_per_leaf=PLAYOUTS_PER_LEAF,
+                 exploration=EXPLORATION, rule=DEFAULT_RULE):
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        self.workers = workers
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.playouts_per_leaf = playouts_per_leaf
+        self.exploration = exploration
+        self.rule = rule
+        self.stats = {}
+
+        self._pool = None
+        self._root = None
+        self._root_position = None
+        self._nodes = 0
+        self._rng = random.Random()
+
+    def _get_pool(self):
+        if self._pool is None and self.workers > 0:
+            # A fork of a running Gtk process is not safe to use
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                'forkserver' if 'forkserver' in methods else 'spawn')
+            self._pool = context.Pool(self.workers)
+        return self._pool
+
+    def start(self):
+        '''Start the worker pool now instead of in the first search.'''
+        self._get_pool()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def _count(self, node):
+        return 1 + sum(self._count(child) for child in node.children.values())
+
+    def _set_root(self, position):
+        '''Reuse the subtree for position if it is one or two moves ahead.'''
+        root = self._root
+        if root is not None and position.numbers == self._root_position.numbers:
+            return
+        if root is not None:
+            added = set(position.numbers).difference(self._root_position.numbers)
+            if (len(added) <= 2 and
+                    len(position) == len(self._root_position) + len(added)):
+                for child in root.children.values():
+                    if child.move not in added:
+                        continue
+                    rest = added - {child.move}
+                    if not rest:
+                        root = child
+                        break
+                    grandchild = child.children.get(rest.pop())
+                    if grandchild is not None:
+                        root = grandchild
+                        break
+                else:
+                    root = None
+            else:
+                root = None
+
+        if root is None:
+            root = Node()
+            self._nodes = 1
+        else:
+            root.parent = None
+            self._nodes = self._count(root)
+        self._root = root
+        self._root_position = position.copy()
+
+    def _select(self, position):
+        '''Walk down to a leaf, expanding it, and apply a virtual loss.'''
+        node = self._root
+        n = self.playouts_per_leaf
+        node.visits += n
+        while True:
+            if node.untried is None:
+                node.untried = list(position.legal)
+                self._rng.shuffle(node.untried)
+            if node.untried and self._nodes < self.max_nodes:
+                move = node.untried.pop()
+                child = Node(move, node)
+                node.children[move] = child
+                self._nodes += 1
+                position.add(move)
+                child.visits += n
+                return child
+            if not node.children:
+                return node
+            node = node.best_child(self.exploration)
+            position.add(node.move)
+            node.visits += n
+
+    def _backpropagate(self, node, to_move_wins):
+        # Visits were already counted by the virtual loss
+        wins = self.playouts_per_leaf - to_move_wins
+        while node is not None:
+            node.wins += wins
+            wins = self.playouts_per_leaf - wins
+            node = node.parent
+
+    def search(self, position):
+        '''Return the best difference to add to position, or None.'''
+        if position.is_over():
+            return None
+        self._set_root(position)
+
+        self._get_pool()
+        start = time.perf_counter()
+        playouts = self._run(self.time_limit)
+        return self._pick(position, playouts, time.perf_counter() - start)
+
+    def search_steps(self, position, wake=None):
+        '''Like search(), as a generator for an idle callback.
+
+        Steps and wake() work as in think_steps(); the move is the
+        generator's return value.
+        '''
+        if position.is_over():
+            return None
+        self._set_root(position)
+
+        self._get_pool()
+        start = time.perf_counter()
+        deadline = start + self.time_limit
+        playouts = 0
+        while True:
+            playouts += yield from self._batch_steps(wake)
+            if time.perf_counter() >= deadline:
+                return self._pick(position, playouts,
+                                  time.perf_counter() - start)
+            yield
+
+    def _pick(self, position, playouts, elapsed):
+        '''The most visited move, with the stats of the search.'''
+        self.stats = {
+            'playouts': playouts,
+            'seconds': elapsed,
+            'playouts_per_second': playouts / elapsed if elapsed else 0.0,
+            'nodes': self._nodes,
+            'workers': self.workers,
+            'win_rate': None,
+        }
+        if not self._root.children:
+            # Only if max_nodes leaves no room below the root
+            return min(position.legal)
+        best = max(self._root.children.values(), key=lambda c: c.visits)
+        self.stats['win_rate'] = best.wins / best.visits
+        return best.move
+
+    def think(self, position, seconds):
+        '''Grow the tree for position without picking a move.
+
+        Used to search ahead while the opponent is thinking; the next
+        search() from a position one or two moves later reuses it.
+        '''
+        if not position.is_over():
+            self._set_root(position)
+            self._run(seconds)
+
+    def think_steps(self, position, wake=None, seconds=THINK_LIMIT):
+        '''Like think(), as a generator for an idle callback.
+
+        Each batch of playouts runs in the pool while the generator
+        yields True, so a step only selects leaves or backs results up
+        and never waits for the workers; wake() is called from another
+        thread once the batch is back.  It stops once the tree holds
+        max_nodes or after `seconds`.  Closing it drops the batch in
+        flight.
+        '''
+        if position.is_over():
+            return
+        self._set_root(position)
+        self._get_pool()
+        deadline = time.perf_counter() + seconds
+        while (self._nodes < self.max_nodes and
+               time.perf_counter() < deadline):
+            yield from self._batch_steps(wake)
+            yield
+
+    def _batch_steps(self, wake):
+        '''Run one batch; yields True while it is in the pool.'''
+        leaves, jobs = self._select_batch()
+        if self._pool is None:
+            results = [run_playouts(*job) for job in jobs]
+        else:
+            # Set from the pool's result thread, before ready() is
+            done = threading.Event()
+
+            def finished(_):
+                done.set()
+                if wake is not None:
+                    wake()
+
+            pending = self._pool.starmap_async(
+                run_playouts, jobs, chunksize=LEAVES_PER_WORKER,
+                callback=finished, error_callback=finished)
+            try:
+                while not done.is_set():
+                    yield True
+            finally:
+                if not done.is_set():
+                    # Deepest first: a leaf may lie below another
+                    for leaf in reversed(leaves):
+                        self._undo_virtual_loss(leaf)
+            results = pending.get()
+        for leaf, to_move_wins in zip(leaves, results):
+            self._backpropagate(leaf, to_move_wins)
+        return len(jobs) * self.playouts_per_leaf
+
+    def _undo_virtual_loss(self, leaf):
+        node = leaf
+        while node is not None:
+            node.visits -= self.playouts_per_leaf
+            node = node.parent
+        if leaf.visits == 0 and leaf.parent is not None:
+            # Expanded for this batch only: put the move back
+            del leaf.parent.children[leaf.move]
+            leaf.parent.untried.append(leaf.move)
+            self._nodes -= 1
+
+    def _select_batch(self):
+        '''Select one batch of leaves; return them with their playout jobs.'''
+        # Enough leaves per round to amortise the trip to the workers
+        batch = max(1, self.workers) * LEAVES_PER_WORKER
+        leaves = []
+        jobs = []
+        for _ in range(batch):
+            leaf_position = self._root_position.copy()
+            leaf = self._select(leaf_position)
+            if leaf_position.is_over():
+                # The player who just moved has won
+                self._backpropagate(leaf, 0)
+                continue
+            leaves.append(leaf)
+            jobs.append((self.rule, leaf_position.numbers,
+                         self.playouts_per_leaf,
+                         self._rng.getrandbits(32)))
+        return leaves, jobs
+
+    def _run(self, seconds):
+        '''Search for `seconds`, counted once the pool is up, and at
+        least one batch.'''
+        pool = self._get_pool()
+        deadline = time.perf_counter() + seconds
+        playouts = 0
+
+        while True:
+            leaves, jobs = self._select_batch()
+            if pool is not None:
+                results = pool.starmap(run_playouts, jobs,
+                                       chunksize=LEAVES_PER_WORKER)
+            else:
+                results = [run_playouts(*job) for job in jobs]
+            for leaf, to_move_wins in zip(leaves, results):
+                self._backpropagate(leaf, to_move_wins)
+            playouts += len(jobs) * self.playouts_per_leaf
+            if time.perf_counter() >= deadline:
+                return playouts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--numbers', type=int, nargs='+', default=[24, 66])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--time', type=float, default=TIME_LIMIT)
+    parser.add_argument('--nodes', type=int, default=MAX_NODES)
+    parser.add_argument('--rule', choices=sorted(RULES), default=DEFAULT_RULE)
+    args = parser.parse_args(argv)
+
+    search = MCTSSearch(workers=args.workers, time_limit=args.time,
+                        max_nodes=args.nodes, rule=args.rule)
+    try:
+        move = search.search(get_rule(args.rule).new_position(args.numbers))
+    finally:
+        search.close()
+    stats = search.stats
+    print(f"move {move}: {stats['playouts']} playouts in "
+          f"{stats['seconds']:.2f}s ({stats['playouts_per_second']:.0f}/s) "
+          f"with {stats['workers']} workers, {stats['nodes']} nodes")
+
+
+if __name__ == '__main__':
+    main()
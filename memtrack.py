@@ -0,0 +1,133 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import gc
+import os
+import tracemalloc
+
+# Stack depth recorded per allocation; more is slower but finds owners
+TRACE_FRAMES = 5
+
+# Allocation sites listed when comparing two snapshots
+TOP_SITES = 10
+
+
+def rss_kb():
+    '''Resident set size of this process in KiB, or None if unknown.'''
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def count_gobjects():
+    '''Number of live GObject wrappers, by type name.'''
+    try:
+        from gi.repository import GObject
+    except ImportError:
+        return {}
+    gc.collect()
+    counts = {}
+    for obj in gc.get_objects():
+        if isinstance(obj, GObject.Object):
+            name = type(obj).__name__
+            counts[name] = counts.get(name, 0) + 1
+    return counts
+
+
+class MemoryTracker:
+    '''
+    Follows memory use from one game to the next.
+
+    Call mark() after each game.  Python allocations are traced with
+    tracemalloc; `gobjects=True` also counts live GObject wrappers,
+    which catches widgets and signal closures kept alive by mistake but
+    needs a full collection, so it is best done every few games.
+    '''
+
+    def __init__(self):
+        self.marks = []
+        self._baseline = None
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+            self._started_tracing = True
+        self.marks = []
+        self._baseline = None
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def mark(self, label, gobjects=False):
+        '''Record the current usage and return it with the change since
+        the previous mark.'''
+        current, peak = tracemalloc.get_traced_memory()
+        entry = {
+            'label': label,
+            'traced_kb': current / 1024,
+            'peak_kb': peak / 1024,
+            'rss_kb': rss_kb(),
+        }
+        if gobjects:
+            counts = count_gobjects()
+            entry['gobjects'] = sum(counts.values())
+            entry['gobject_types'] = counts
+
+        previous = self.marks[-1] if self.marks else None
+        if previous is not None:
+            entry['delta_kb'] = entry['traced_kb'] - previous['traced_kb']
+        self.marks.append(entry)
+        tracemalloc.reset_peak()
+        return entry
+
+    def snapshot_baseline(self):
+        '''Remember the allocations now, for top_growth() later.'''
+        gc.collect()
+        self._baseline = tracemalloc.take_snapshot()
+
+    def top_growth(self, limit=TOP_SITES):
+        '''The allocation sites that grew most since snapshot_baseline().'''
+        if self._baseline is None:
+            return []
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(self._baseline, 'traceback')
+        lines = []
+        for stat in stats[:limit]:
+            if stat.size_diff <= 0:
+                continue
+            frame = stat.traceback[-1]
+            lines.append(f"{stat.size_diff / 1024:+.1f} KiB in "
+                         f"{stat.count_diff:+d} blocks at "
+                         f"{frame.filename}:{frame.lineno}")
+        return lines
+
+    def growth_since(self, index):
+        '''Traced and GObject growth from marks[index] to the last mark.'''
+        first, last = self.marks[index], self.marks[-1]
+        growth = {'traced_kb': last['traced_kb'] - first['traced_kb']}
+        if 'gobjects' in first and 'gobjects' in last:
+            growth['gobjects'] = last['gobjects'] - first['gobjects']
+        if first['rss_kb'] is not None and last['rss_kb'] is not None:
+            growth['rss_kb'] = last['rss_kb'] - first['rss_kb']
+        return growth
@@ -0,0 +1,105 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import os
+from enum import Enum
+from gi.repository import GLib
+
+# Overrides the pacing of every game mode, eg. EUCLIDS_PACING=instant
+# for automated drills and UI tests.
+PACING_ENV = 'EUCLIDS_PACING'
+
+
+class PacingMode(Enum):
+    INSTANT = 1
+    FIXED = 2
+    ADAPTIVE = 3
+
+
+class Pacer:
+    """Schedules the delays that make automated turns readable.
+
+    In FIXED mode a delay is waited out in full.  In ADAPTIVE mode the
+    time already spent computing the move is subtracted, so a slow bot
+    does not also wait the whole display delay.  In INSTANT mode every
+    step runs on the next idle, which is what headless runs want.
+
+    The mode is chosen per key (normally a GameMode); keys without an
+    explicit mode use default_mode.  Pending steps can be dropped with
+    cancel(), eg. when a game is reset.
+    """
+
+    def __init__(self, modes=None, default_mode=PacingMode.FIXED):
+        self.modes = dict(modes or {})
+        self.default_mode = default_mode
+        self._override = None
+        self._sources = set()
+
+        env_mode = os.environ.get(PACING_ENV)
+        if env_mode:
+            try:
+                self._override = PacingMode[env_mode.upper()]
+            except KeyError:
+                print(f"WARNING: Unknown {PACING_ENV} value: {env_mode}")
+
+    def get_mode(self, key):
+        if self._override is not None:
+            return self._override
+        return self.modes.get(key, self.default_mode)
+
+    def set_mode(self, key, mode):
+        self.modes[key] = mode
+
+    def get_delay(self, key, delay, think_time=0.0):
+        """Return the display delay in ms left for a step.
+
+        delay is the nominal delay in ms and think_time the seconds
+        already spent producing the step.
+        """
+        mode = self.get_mode(key)
+        if mode == PacingMode.INSTANT:
+            return 0
+        if mode == PacingMode.ADAPTIVE:
+            return max(0, int(delay - think_time * 1000))
+        return delay
+
+    def schedule(self, key, delay, callback, *args, think_time=0.0):
+        """Call callback(*args) once after the paced delay"""
+        remaining = self.get_delay(key, delay, think_time)
+        source_id = None
+
+        def run():
+            self._sources.discard(source_id)
+            callback(*args)
+            return False
+
+        if remaining <= 0:
+            source_id = GLib.idle_add(run)
+        else:
+            source_id = GLib.timeout_add(remaining, run)
+        self._sources.add(source_id)
+        return source_id
+
+    def cancel(self):
+        """Drop every step that has not run yet"""
+        for source_id in self._sources:
+            GLib.source_remove(source_id)
+        self._sources.clear()
+
+    @property
+    def pending(self):
+        return bool(self._sources)
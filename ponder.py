@@ -0,0 +1,144 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+import time
+
+# Longest stretch, in seconds, pondering may hold the main loop
+PONDER_SLICE = 0.008
+
+
+class Ponderer:
+    """Works out the bot's replies while the human is still thinking.
+
+    start() walks the human's legal moves in the background, from the
+    differences the most pairs produce down, and caches the bot's reply
+    to each.  The work runs in short slices from a low priority idle
+    source so input and drawing always come first; the bot's scoring is
+    itself split into steps (Bot.move_steps) so that no single step
+    outlasts a slice by much, even on large boards.  take() returns the
+    cached reply for the move that was actually played, if it got that
+    far.  answer() works out the bot's own move the same way when
+    nothing was cached.  A bot that can_think (the Master search) is
+    instead given the
+    idle time to grow its search tree for the current position, up to
+    the search's node and time budget.  Its playouts run in the search's
+    worker pool; while a batch is out the idle source is removed, and
+    the pool's result callback puts it back through wake().
+    """
+
+    def __init__(self):
+        self._task = None
+        self._source_id = None
+        self._waiting = False
+        self._on_done = None
+        self._replies = {}
+        self._base_size = None
+
+    @property
+    def active(self):
+        return self._task is not None
+
+    @property
+    def answering(self):
+        return self._on_done is not None
+
+    def start(self, bot, position):
+        self.cancel()
+        if position.is_over():
+            return
+        position = position.copy()
+        self._base_size = len(position)
+        if getattr(bot, 'can_think', False):
+            self._task = self._think(bot, position)
+        else:
+            self._task = self._ponder(bot, position)
+        self._schedule()
+
+    def answer(self, bot, position, callback):
+        """Work out the bot's move in idle slices, then callback(move)"""
+        self.cancel()
+        self._task = bot.move_steps(position.copy(), self.wake)
+        self._on_done = callback
+        self._schedule()
+
+    def wake(self):
+        """Resume a task waiting on the workers; safe from any thread"""
+        GLib.idle_add(self._wake_cb)
+
+    def cancel(self):
+        """Stop pondering and forget the cached replies"""
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
+        if self._task is not None:
+            self._task.close()
+        self._task = None
+        self._waiting = False
+        self._on_done = None
+        self._replies = {}
+        self._base_size = None
+
+    def take(self, position, diff):
+        """Return the cached reply once diff has been added, or None"""
+        if self._base_size is None or len(position) != self._base_size + 1:
+            return None
+        reply = self._replies.get(diff)
+        self.cancel()
+        return reply
+
+    def _ponder(self, bot, position):
+        for diff in sorted(position.legal, key=lambda d: -position.legal[d]):
+            after = position.copy()
+            after.add(diff)
+            self._replies[diff] = yield from bot.move_steps(after)
+            yield
+
+    def _think(self, bot, position):
+        yield from bot.think_steps(position, self.wake)
+
+    def _schedule(self):
+        self._waiting = False
+        self._source_id = GLib.idle_add(self._step_cb,
+                                        priority=GLib.PRIORITY_LOW)
+
+    def _wake_cb(self):
+        # A wake for a task since cancelled, or one that has not gone
+        # to sleep yet, finds nothing waiting
+        if self._waiting and self._task is not None:
+            self._schedule()
+        return False
+
+    def _step_cb(self):
+        deadline = time.monotonic() + PONDER_SLICE
+        try:
+            while time.monotonic() < deadline:
+                if next(self._task):
+                    # Waiting on the search workers: sleep until wake()
+                    self._source_id = None
+                    self._waiting = True
+                    return False
+        except StopIteration as stop:
+            self._source_id = None
+            self._task = None
+            on_done, self._on_done = self._on_done, None
+            if on_done is not None:
+                on_done(stop.value)
+            return False
+        return True
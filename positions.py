@@ -0,0 +1,128 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Starting positions for Euclid's game.
+
+Whatever the players do, a board always ends up holding every multiple
+of the starting gcd up to the starting maximum, so the length of a game
+is fixed by its opening::
+
+    total_moves(numbers) == max(numbers) // gcd(numbers) - len(numbers)
+
+and the first player wins exactly when that number is odd.  The
+generators below use this to hit a requested game length without
+playing anything out.
+'''
+
+import random
+from functools import reduce
+from math import gcd
+
+
+def board_gcd(numbers):
+    return reduce(gcd, numbers, 0)
+
+
+def total_moves(numbers):
+    '''Number of moves left until the board is closed.'''
+    if not numbers:
+        return 0
+    return max(numbers) // board_gcd(numbers) - len(set(numbers))
+
+
+def first_player_wins(numbers):
+    '''True if the player about to move wins from this position.'''
+    return total_moves(numbers) % 2 == 1
+
+
+class PositionGenerator:
+    '''
+    Seeded generator of starting positions.
+
+    With `ranges`, one number is drawn from each (low, high) range, which
+    is how the classic game has always started.  Otherwise `count`
+    numbers up to `max_value` are built so that the game lasts between
+    `min_moves` and `max_moves` moves.  `first_player_wins` forces the
+    parity of that length when not None.
+
+    The same seed always yields the same sequence of positions.
+    '''
+
+    def __init__(self, seed=None, ranges=None, count=2, max_value=100,
+                 min_moves=1, max_moves=None, first_player_wins=None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        self.seed = seed
+        self.ranges = ranges
+        self.count = count
+        self.max_value = max_value
+        self.min_moves = max(1, min_moves)
+        self.max_moves = max_moves
+        self.first_player_wins = first_player_wins
+        self._random = random.Random(seed)
+
+    def generate(self):
+        '''Return a new sorted starting position.'''
+        if self.ranges:
+            while True:
+                numbers = sorted({self._random.randint(low, high)
+                                  for low, high in self.ranges})
+                if len(numbers) > 1 and total_moves(numbers) > 0:
+                    return numbers
+        return self._generate_for_length(self._pick_length())
+
+    def _pick_length(self):
+        # Every multiple of g up to max_value is needed on the final board.
+        longest = self.max_value - self.count
+        max_moves = min(self.max_moves or longest, longest)
+        min_moves = max(1, min(self.min_moves, max_moves))
+        if max_moves < 1:
+            raise ValueError('max_value is too small for the opening size')
+
+        moves = self._random.randint(min_moves, max_moves)
+        if self.first_player_wins is not None:
+            if (moves % 2 == 1) != self.first_player_wins:
+                moves += 1 if moves < max_moves else -1
+        # A range of one length cannot give both parities
+        return max(min_moves, min(moves, max_moves))
+
+    def _generate_for_length(self, moves):
+        # The final board is g, 2g, ... kg; the opening is `count` of
+        # those multiples, including kg itself, whose quotients are
+        # coprime so that the gcd really is g.
+        k = moves + self.count
+        g = self._random.randint(1, max(1, self.max_value // k))
+        while True:
+            quotients = [k] + self._random.sample(range(1, k), self.count - 1)
+            if reduce(gcd, quotients) == 1:
+                return sorted(q * g for q in quotients)
+
+
+PRESETS = {
+    'classic': dict(ranges=((20, 40), (60, 80))),
+    'challenge': dict(count=3, max_value=1000, min_moves=40, max_moves=150),
+    'stress': dict(count=4, max_value=10 ** 6, min_moves=5000,
+                   max_moves=10000),
+}
+
+
+def get_generator(preset='classic', seed=None, **options):
+    '''Return a PositionGenerator for a named preset, with overrides.'''
+    settings = dict(PRESETS[preset])
+    settings.update(options)
+    return PositionGenerator(seed=seed, **settings)
@@ -0,0 +1,130 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import cProfile
+import io
+import os
+import time
+
+# Set to profile a whole session from launch, eg. EUCLIDS_PROFILE=1
+PROFILE_ENV = 'EUCLIDS_PROFILE'
+
+# Main loop entry points of Game that are timed and profiled
+PROFILED_METHODS = ('make_move', 'bot_move', 'update_board',
+                    'on_message_received')
+
+# Functions listed in the text summary
+TOP_FUNCTIONS = 25
+
+
+class SessionProfiler:
+    """Profiles selected methods of an object between start() and stop().
+
+    While running, the methods are shadowed by instance attributes that
+    time each call and run it under cProfile; stop() removes them again,
+    so nothing is left in the call path while profiling is off.  Each
+    session is written to output_dir as a .prof file for pstats or
+    snakeviz, plus a .txt summary of the hot spots.
+    """
+
+    def __init__(self, target, output_dir, methods=PROFILED_METHODS):
+        self._target = target
+        self._output_dir = output_dir
+        self._methods = methods
+        self._profile = None
+        self._timings = {}
+        self._depth = 0
+        self._started = None
+
+    @property
+    def active(self):
+        return self._profile is not None
+
+    def start(self):
+        if self.active:
+            return
+        self._profile = cProfile.Profile()
+        self._timings = {name: [0, 0.0, 0.0] for name in self._methods}
+        self._depth = 0
+        self._started = time.time()
+        for name in self._methods:
+            setattr(self._target, name,
+                    self._wrap(name, getattr(self._target, name)))
+
+    def stop(self):
+        """Stop profiling and return the paths of the dump and summary"""
+        if not self.active:
+            return None
+        for name in self._methods:
+            self._target.__dict__.pop(name, None)
+        profile = self._profile
+        self._profile = None
+        return self._dump(profile)
+
+    def _wrap(self, name, method):
+        timing = self._timings[name]
+
+        def wrapper(*args, **kwargs):
+            # Nested entry points, eg. make_move from on_message_received,
+            # are timed but profiled as part of the outer call.
+            outermost = self._depth == 0
+            self._depth += 1
+            if outermost:
+                self._profile.enable()
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                if outermost:
+                    self._profile.disable()
+                self._depth -= 1
+                timing[0] += 1
+                timing[1] += elapsed
+                timing[2] = max(timing[2], elapsed)
+        return wrapper
+
+    def summary(self, profile=None):
+        out = io.StringIO()
+        out.write(f"Session: {time.ctime(self._started)}, "
+                  f"{time.time() - self._started:.1f}s\n\n")
+        out.write(f"{'callback':<24}{'calls':>8}{'total ms':>12}"
+                  f"{'mean ms':>10}{'max ms':>10}\n")
+        for name, (calls, total, longest) in self._timings.items():
+            mean = total / calls if calls else 0.0
+            out.write(f"{name:<24}{calls:>8}{total * 1000:>12.1f}"
+                      f"{mean * 1000:>10.2f}{longest * 1000:>10.2f}\n")
+
+        profile = profile or self._profile
+        if profile is not None and profile.getstats():
+            out.write("\n")
+            # pstats pulls in typing and dataclasses; this module is
+            # imported before the first frame to check PROFILE_ENV
+            import pstats
+            stats = pstats.Stats(profile, stream=out)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        return out.getvalue()
+
+    def _dump(self, profile):
+        os.makedirs(self._output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self._started))
+        base = os.path.join(self._output_dir, f'profile-{stamp}')
+        if profile.getstats():
+            profile.dump_stats(base + '.prof')
+        with open(base + '.txt', 'w') as f:
+            f.write(self.summary(profile))
+        return base + '.prof', base + '.txt'
@@ -0,0 +1,438 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Replay archives of finished games.
+
+A game is fully described by its opening and the ordered list of
+differences that were added, since players alternate starting with
+player 1.  Only games of the difference rule can be stored: there is no
+room for the rule, and every game is replayed with it.  An archive
+stores many games back to back, little-endian::
+
+    header   b'EUCR', version (u16), reserved (u16)
+    game     opening count (u16), mode (u8), winner (u8), move count (u32),
+             opening numbers (u32 each), differences (u32 each)
+    ...
+    index    offset of every game (u64 each)
+    footer   index offset (u64), game count (u32), b'EIDX'
+
+The index lets a reader jump to any game without parsing the ones
+before it, and `ReplayCursor` seeks to any move of a game at engine
+speed.  Pack finished games from journal entries and games databases
+(see archive.py), searching directories recursively::
+
+    python3 replay.py pack games.eucr ~/journal-exports games.sqlite
+
+Summarise or re-check an archive from the command line::
+
+    python3 replay.py info games.eucr
+    python3 replay.py simulate games.eucr
+
+or watch one of its games::
+
+    python3 replay.py play games.eucr --game 3 --move 10
+'''
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import Counter, namedtuple
+
+from engine import Position
+from rules import DEFAULT_RULE
+
+MAGIC = b'EUCR'
+INDEX_MAGIC = b'EIDX'
+VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sHH')
+GAME_HEADER = struct.Struct('<HBBI')
+FOOTER = struct.Struct('<QI4s')
+
+# A snapshot of the position is kept every this many moves while seeking
+CHECKPOINT_INTERVAL = 256
+
+SQLITE_MAGIC = b'SQLite format 3\x00'
+
+ReplayGame = namedtuple('ReplayGame', 'numbers diffs mode winner')
+ReplayGame.__new__.__defaults__ = (0, 0)
+
+
+class ReplayError(Exception):
+    pass
+
+
+def _pack_numbers(values):
+    data = array('I', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _unpack_numbers(data):
+    values = array('I')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _check_rule(rule):
+    if (rule or DEFAULT_RULE) != DEFAULT_RULE:
+        raise ReplayError(f'{rule} games cannot be stored')
+
+
+def from_state(state):
+    '''Build a ReplayGame from a `Game.save_state` dictionary.
+
+    Raises ReplayError for a game of another rule than the difference
+    rule.
+    '''
+    _check_rule(state.get('rule'))
+    history = state.get('move_history', [])
+    diffs = [int(move['diff']) for move in history]
+    played = set(diffs)
+    numbers = [n for n in state.get('active_numbers', []) if n not in played]
+    winner = state.get('winner') or 0
+    return ReplayGame(sorted(numbers), diffs, state.get('game_mode', 0),
+                      winner)
+
+
+def from_row(row):
+    '''Build a ReplayGame from a game of `archive.GameArchive`.
+
+    Raises ReplayError as from_state() does.
+    '''
+    _check_rule(row.get('rule'))
+    return ReplayGame(sorted(json.loads(row['opening'])),
+                      json.loads(row['moves']), row['mode'],
+                      row['winner'] or 0)
+
+
+def to_moves(game, count=None):
+    '''Yield history entries in the `Game.move_history` format.'''
+    position = Position(game.numbers)
+    diffs = game.diffs if count is None else game.diffs[:count]
+    for index, diff in enumerate(diffs):
+        low, high = position.pair_for(diff) or (0, 0)
+        yield {'player': index % 2 + 1, 'num1': high, 'num2': low,
+               'diff': diff}
+        position.add(diff)
+
+
+def simulate(game, validate=True):
+    '''Yield the position after each move of game.
+
+    The same Position object is updated and yielded every time; copy it
+    to keep a snapshot.
+    '''
+    position = Position(game.numbers)
+    for index, diff in enumerate(game.diffs):
+        if validate and diff not in position.legal:
+            raise ReplayError(f'move {index + 1} adds {diff}, '
+                              f'which is not a legal difference')
+        position.add(diff)
+        yield position
+
+
+def fast_forward(game, move=None, validate=False):
+    '''Return the position after the first `move` moves of game.'''
+    position = Position(game.numbers)
+    diffs = game.diffs if move is None else game.diffs[:move]
+    for diff in diffs:
+        if validate and diff not in position.legal:
+            raise ReplayError(f'{diff} is not a legal difference')
+        position.add(diff)
+    return position
+
+
+class ReplayWriter:
+    '''Appends games to a new archive; close() writes the index.'''
+
+    def __init__(self, path):
+        self._file = open(path, 'wb')
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+        self._offsets = array('Q')
+
+    def add_game(self, numbers, diffs, mode=0, winner=0):
+        self._offsets.append(self._file.tell())
+        self._file.write(GAME_HEADER.pack(len(numbers), mode, winner or 0,
+                                          len(diffs)))
+        self._file.write(_pack_numbers(numbers))
+        self._file.write(_pack_numbers(diffs))
+
+    def add_state(self, state):
+        '''Append a game saved by `Game.save_state`; see from_state().'''
+        game = from_state(state)
+        self.add_game(game.numbers, game.diffs, game.mode, game.winner)
+
+    def close(self):
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        offsets = array('Q', self._offsets)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        self._file.write(offsets.tobytes())
+        self._file.write(FOOTER.pack(index_offset, len(self._offsets),
+                                     INDEX_MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayReader:
+    '''Random and streaming access to the games of an archive.'''
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        magic, version, _ = FILE_HEADER.unpack(
+            self._file.read(FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ReplayError(f'{path} is not a replay archive')
+        if version > VERSION:
+            raise ReplayError(f'{path} uses replay format {version}')
+
+        self._file.seek(-FOOTER.size, 2)
+        self._index_offset, self._count, magic = FOOTER.unpack(
+            self._file.read(FOOTER.size))
+        if magic != INDEX_MAGIC:
+            raise ReplayError(f'{path} has no index, was it closed?')
+        self._offsets = None
+
+    def __len__(self):
+        return self._count
+
+    def _read_game(self):
+        count, mode, winner, moves = GAME_HEADER.unpack(
+            self._file.read(GAME_HEADER.size))
+        numbers = _unpack_numbers(self._file.read(count * 4))
+        diffs = _unpack_numbers(self._file.read(moves * 4))
+        return ReplayGame(numbers.tolist(), diffs.tolist(), mode, winner)
+
+    def game(self, index):
+        '''Return the game at index, reading nothing else but the index.'''
+        if self._offsets is None:
+            self._file.seek(self._index_offset)
+            self._offsets = array('Q')
+            self._offsets.frombytes(self._file.read(self._count * 8))
+            if sys.byteorder == 'big':
+                self._offsets.byteswap()
+        self._file.seek(self._offsets[index])
+        return self._read_game()
+
+    def __iter__(self):
+        '''Stream every game in file order.'''
+        self._file.seek(FILE_HEADER.size)
+        for _ in range(self._count):
+            yield self._read_game()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayCursor:
+    '''
+    A position within one game that can be moved to any move.
+
+    Seeking forwards continues from the current position, seeking
+    backwards restarts from the closest snapshot taken on the way, so
+    scrubbing back and forth never replays the whole game.
+    '''
+
+    def __init__(self, game):
+        self.game = game
+        self.move = 0
+        self.position = Position(game.numbers)
+        self._checkpoints = {0: self.position.copy()}
+
+    def __len__(self):
+        return len(self.game.diffs)
+
+    def seek(self, move):
+        '''Move to the position after the first `move` moves.'''
+        move = max(0, min(move, len(self.game.diffs)))
+        if move < self.move:
+            start = max(m for m in self._checkpoints if m <= move)
+            self.position = self._checkpoints[start].copy()
+            self.move = start
+
+        diffs = self.game.diffs
+        while self.move < move:
+            self.position.add(diffs[self.move])
+            self.move += 1
+            if (self.move % CHECKPOINT_INTERVAL == 0 and
+                    self.move not in self._checkpoints):
+                self._checkpoints[self.move] = self.position.copy()
+        return self.position
+
+    @property
+    def current_player(self):
+        return self.move % 2 + 1
+
+
+def _iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _read_games(path):
+    '''Yield (converter, record) for each game in a journal entry or
+    games database; converter(record) builds the ReplayGame.'''
+    with open(path, 'rb') as f:
+        head = f.read(len(SQLITE_MAGIC))
+    if head == SQLITE_MAGIC:
+        from archive import GameArchive
+        archive = GameArchive(path)
+        try:
+            for row in archive.iter_games():
+                yield from_row, row
+        finally:
+            archive.close()
+        return
+
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        state = data.get('game_state', data)
+        if state.get('active_numbers'):
+            yield from_state, state
+
+
+def _pack(args):
+    import sqlite3
+
+    output = os.path.abspath(args.archive)
+    packed = 0
+    skipped = Counter()
+    with ReplayWriter(args.archive) as writer:
+        for path in _iter_files(args.inputs):
+            if os.path.abspath(path) == output:
+                continue
+            try:
+                for convert, record in _read_games(path):
+                    # Only finished games; archive rows always are
+                    if not record.get('game_over', True):
+                        skipped['unfinished'] += 1
+                        continue
+                    try:
+                        game = convert(record)
+                    except (ReplayError, KeyError, ValueError) as e:
+                        skipped[str(e)] += 1
+                        continue
+                    writer.add_game(game.numbers, game.diffs, game.mode,
+                                    game.winner)
+                    packed += 1
+            except (OSError, ValueError, sqlite3.Error) as e:
+                print(f'skipping {path}: {e}', file=sys.stderr)
+    print(f'{packed} games packed into {args.archive}')
+    for reason, count in skipped.most_common():
+        print(f'  {count} skipped: {reason}')
+
+
+def _info(args):
+    with ReplayReader(args.archive) as reader:
+        moves = 0
+        for game in reader:
+            moves += len(game.diffs)
+        print(f'{len(reader)} games, {moves} moves')
+
+
+def _simulate(args):
+    start = time.perf_counter()
+    moves = 0
+    with ReplayReader(args.archive) as reader:
+        for number, game in enumerate(reader):
+            position = None
+            try:
+                for position in simulate(game):
+                    moves += 1
+            except ReplayError as e:
+                print(f'game {number}: {e}')
+                continue
+            if position is not None and not position.is_over():
+                print(f'game {number}: ends before the board is closed')
+    elapsed = time.perf_counter() - start
+    rate = moves / elapsed if elapsed else 0
+    print(f'{moves} moves in {elapsed:.3f}s ({rate:.0f} moves/s)')
+
+
+def _play(args):
+    import gi
+    gi.require_version("Gtk", "3.0")
+    from gi.repository import Gtk
+    from game import Game
+
+    with ReplayReader(args.archive) as reader:
+        game = reader.game(args.game)
+    window = Game()
+    window.open_replay(game, args.move)
+    Gtk.main()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    pack = commands.add_parser('pack', help='pack finished games from '
+                               'journal entries and games databases')
+    pack.add_argument('archive')
+    pack.add_argument('inputs', nargs='+')
+    pack.set_defaults(func=_pack)
+
+    info = commands.add_parser('info', help='count the games and moves')
+    info.add_argument('archive')
+    info.set_defaults(func=_info)
+
+    check = commands.add_parser('simulate',
+                                help='re-check every game at engine speed')
+    check.add_argument('archive')
+    check.set_defaults(func=_simulate)
+
+    play = commands.add_parser('play', help='watch a game')
+    play.add_argument('archive')
+    play.add_argument('--game', type=int, default=0)
+    play.add_argument('--move', type=int, default=None)
+    play.set_defaults(func=_play)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+'''
+Rule variants of Euclid's game.
+
+A rule decides which numbers a move picks and which number it adds.
+Each one comes with a position kernel sharing the interface of
+`engine.Position`: `legal` maps every number that may be added to the
+number of selections producing it and is updated incrementally by
+`add`, so the UI, the bots and network validation all ask the same
+index instead of scanning pairs.
+'''
+
+from bisect import insort
+from functools import reduce
+from math import gcd
+
+from engine import Position
+
+# Modulus of the sum rule; prime so that every residue can be reached
+SUM_MODULUS = 101
+
+# Most numbers a bounded board may hold
+BOARD_LIMIT = 16
+
+
+class PairPosition(Position):
+    '''Kernel for rules adding a number computed from a pair.
+
+    Subclasses define _combine(a, b), returning the number to add or
+    None, and _partner(number, result), returning the number that
+    combines with number into result.
+    '''
+
+    closed_form = False
+
+    def __init__(self, numbers=()):
+        self.numbers = sorted(set(numbers))
+        self._members = set(self.numbers)
+        self.legal = {}
+        self.legal_pairs = 0
+        self.gcd = reduce(gcd, self.numbers, 0)
+
+        numbers = self.numbers
+        for i in range(len(numbers)):
+            for j in range(i + 1, len(numbers)):
+                self._count(self._combine(numbers[i], numbers[j]))
+
+    def _count(self, result):
+        if result is not None and result not in self._members:
+            self.legal[result] = self.legal.get(result, 0) + 1
+            self.legal_pairs += 1
+
+    def add(self, result):
+        self.legal_pairs -= self.legal.pop(result, 0)
+        self._members.add(result)
+        for number in self.numbers:
+            self._count(self._combine(number, result))
+        insort(self.numbers, result)
+
+    def pairs_after(self, result):
+        count = self.legal_pairs - self.legal.get(result, 0)
+        for number in self.numbers:
+            new = self._combine(number, result)
+            if new is not None and new != result and new not in self._members:
+                count += 1
+        return count
+
+    def pairs_for(self, result):
+        members = self._members
+        for number in self.numbers:
+            partner = self._partner(number, result)
+            if partner is not None and partner > number and partner in members:
+                yield (number, partner)
+
+    def result_of(self, num1, num2):
+        return self._combine(num1, num2)
+
+    def is_legal(self, num1, num2):
+        return (num1 != num2 and num1 in self._members and
+                num2 in self._members and
+                self._combine(num1, num2) in self.legal)
+
+
+class SumModPosition(PairPosition):
+    '''Adds (a + b) mod modulus; a zero remainder is not a move.'''
+
+    def __init__(self, numbers=(), modulus=SUM_MODULUS):
+        self.modulus = modulus
+        super().__init__(numbers)
+
+    def _combine(self, a, b):
+        return (a + b) % self.modulus or None
+
+    def _partner(self, number, result):
+        return (result - number) % self.modulus
+
+
+class TriplePosition(Position):
+    '''Picks three numbers a < b < c and adds c - a - b if positive.
+
+    A move creates O(n^2) new triples, so an add costs O(n^2) instead
+    of the O(n) of the pair rules.
+    '''
+
+    arity = 3
+    closed_form = False
+
+    def __init__(self, numbers=()):
+        self.numbers = sorted(set(numbers))
+        self._members = set(self.numbers)
+        self.legal = {}
+        self.legal_pairs = 0
+        self.gcd = reduce(gcd, self.numbers, 0)
+
+        numbers = self.numbers
+        for i in range(len(numbers)):
+            for j in range(i + 1, len(numbers)):
+                for k in range(j + 1, len(numbers)):
+                    self._count(numbers[k] - numbers[j] - numbers[i])
+
+    def _count(self, result):
+        if result > 0 and result not in self._members:
+            self.legal[result] = self.legal.get(result, 0) + 1
+            self.legal_pairs += 1
+
+    def add(self, result):
+        self.legal_pairs -= self.legal.pop(result, 0)
+        self._members.add(result)
+        numbers = self.numbers
+        for i in range(len(numbers)):
+            for j in range(i + 1, len(numbers)):
+                low, high = numbers[i], numbers[j]
+                a, b, c = sorted((low, high, result))
+                self._count(c - b - a)
+        insort(numbers, result)
+
+    def pairs_after(self, result):
+        position = self.copy()
+        position.add(result)
+        return position.legal_pairs
+
+    def pairs_for(self, result):
+        members = self._members
+        numbers = self.numbers
+        for i in range(len(numbers)):
+            for j in range(i + 1, len(numbers)):
+                c = result + numbers[i] + numbers[j]
+                if c in members:
+                    yield (numbers[i], numbers[j], c)
+
+    def result_of(self, *selection):
+        a, b, c = sorted(selection)
+        return c - b - a if c - b - a > 0 else None
+
+    def is_legal(self, *selection):
+        return (len(set(selection)) == 3 and
+                all(number in self._members for number in selection) and
+                self.result_of(*selection) in self.legal)
+
+
+class BoundedPosition(Position):
+    '''The difference rule on a board holding at most `limit` numbers.'''
+
+    def __init__(self, numbers=(), limit=BOARD_LIMIT):
+        self.limit = limit
+        super().__init__(numbers)
+        self._close_if_full()
+
+    def _close_if_full(self):
+        if len(self.numbers) >= self.limit:
+            self.legal = {}
+            self.legal_pairs = 0
+
+    def add(self, diff):
+        super().add(diff)
+        self._close_if_full()
+
+    def pairs_after(self, diff):
+        if len(self.numbers) + 1 >= self.limit:
+            return 0
+        return super().pairs_after(diff)
+
+    def moves_left(self):
+        if not self.numbers:
+            return 0
+        return min(super().moves_left(), max(0, self.limit - len(self.numbers)))
+
+
+class Rule:
+    '''A rule variant: its name, its kernel and how moves read.'''
+
+    name = None
+    label = None
+
+    def new_position(self, numbers):
+        return Position(numbers)
+
+    def opening(self, numbers, rng):
+        '''Adapt a generated starting position to this rule.
+
+        The result may still have no legal move; callers draw another
+        position until new_position(numbers).is_over() is False.
+        '''
+        return numbers
+
+    def describe(self, selection, result):
+        '''Text of a move; result is None when the selection adds nothing.'''
+        text = self._expression(selection)
+        return text if result is None else f"{text} = {result}"
+
+    def _expression(self, selection):
+        num1, num2 = selection
+        return f"{num1} - {num2}"
+
+
+class DifferenceRule(Rule):
+    name = 'difference'
+    label = "Difference"
+
+
+class SumModRule(Rule):
+    name = 'sum-mod'
+    label = f"Sum mod {SUM_MODULUS}"
+
+    def new_position(self, numbers):
+        return SumModPosition(numbers, SUM_MODULUS)
+
+    def opening(self, numbers, rng):
+        numbers = sorted({number % SUM_MODULUS for number in numbers} - {0})
+        while len(numbers) < 2:
+            numbers = sorted(set(numbers) | {rng.randint(1, SUM_MODULUS - 1)})
+        return numbers
+
+    def _expression(self, selection):
+        num1, num2 = selection
+        return f"({num1} + {num2}) mod {SUM_MODULUS}"
+
+
+class ThreeNumberRule(Rule):
+    name = 'three-number'
+    label = "Three Numbers"
+
+    def new_position(self, numbers):
+        return TriplePosition(numbers)
+
+    def opening(self, numbers, rng):
+        # Offer a first move: a number beyond the sum of the two
+        # smallest by less than the smallest, so the result is new.
+        low, high = numbers[0], numbers[1]
+        return sorted(set(numbers) | {low + high + rng.randint(1, max(1, low - 1))})
+
+    def _expression(self, selection):
+        a, b, c = sorted(selection)
+        return f"{c} - {b} - {a}"
+
+
+class BoundedRule(Rule):
+    name = 'bounded'
+    label = f"Bounded ({BOARD_LIMIT} numbers)"
+
+    def new_position(self, numbers):
+        return BoundedPosition(numbers, BOARD_LIMIT)
+
+
+RULES = {rule.name: rule for rule in (DifferenceRule(), SumModRule(),
+                                      ThreeNumberRule(), BoundedRule())}
+
+DEFAULT_RULE = 'difference'
+
+
+def get_rule(name):
+    '''Return the rule called name, or the difference rule if unknown.'''
+    return RULES.get(name, RULES[DEFAULT_RULE])
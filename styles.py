@@ -0,0 +1,71 @@
+# This file is part of the Euclid's game.
+# Copyright (C) 2025 Bishoy Wadea
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, Gdk
+import weakref
+
+_providers = {}
+_screen_providers = set()
+_widget_classes = weakref.WeakKeyDictionary()
+
+
+def get_provider(css):
+    """Return a Gtk.CssProvider for css, parsing each stylesheet only once"""
+    if isinstance(css, str):
+        css = css.encode('utf-8')
+
+    provider = _providers.get(css)
+    if provider is None:
+        provider = Gtk.CssProvider()
+        provider.load_from_data(css)
+        _providers[css] = provider
+    return provider
+
+
+def add_provider_for_screen(css, priority=Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION):
+    """Install css on the default screen unless it is already installed"""
+    provider = get_provider(css)
+    screen = Gdk.Screen.get_default()
+    key = (screen, provider)
+    if key in _screen_providers:
+        return provider
+
+    Gtk.StyleContext.add_provider_for_screen(screen, provider, priority)
+    _screen_providers.add(key)
+    return provider
+
+
+def set_style_classes(widget, classes):
+    """Make the classes managed through this helper on widget equal classes.
+
+    Only the classes that differ from the previous call are added or
+    removed, so unchanged widgets are not restyled.  Classes added to the
+    widget by other means are left alone.
+    """
+    classes = frozenset(classes)
+    current = _widget_classes.get(widget, frozenset())
+    if classes == current:
+        return
+
+    context = widget.get_style_context()
+    for name in current - classes:
+        context.remove_class(name)
+    for name in classes - current:
+        context.add_class(name)
+    _widget_classes[widget] = classes
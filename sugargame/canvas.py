@@ -21,6 +21,8 @@
 #
 
 import os
+import struct
+import zlib
 from gi.repository import Gtk
 from gi.repository import GLib
 from sugar3.activity.activity import PREVIEW_SIZE
@@ -30,6 +32,24 @@ import sugargame.event as event
 CANVAS = None
 
 
+def _png_chunk(tag, body):
+    return (struct.pack('>I', len(body)) + tag + body +
+            struct.pack('>I', zlib.crc32(tag + body) & 0xffffffff))
+
+
+def encode_png(width, height, rgb):
+    """Encode packed 8-bit RGB pixel data as a PNG, entirely in memory"""
+    stride = width * 3
+    # Every scanline is prefixed with filter type 0 (none).
+    raw = b''.join(b'\x00' + rgb[y * stride:(y + 1) * stride]
+                   for y in range(height))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' +
+            _png_chunk(b'IHDR', header) +
+            _png_chunk(b'IDAT', zlib.compress(raw, 6)) +
+            _png_chunk(b'IEND', b''))
+
+
 class PygameCanvas(Gtk.EventBox):
     def __init__(self, activity, main=None, modules=[pygame]):
         Gtk.EventBox.__init__(self)
@@ -88,17 +108,13 @@ class PygameCanvas(Gtk.EventBox):
         if not hasattr(self, "_screen"):
             return None
 
-        _tmp_dir = os.path.join(self._activity.get_activity_root(), "tmp")
-        _file_path = os.path.join(_tmp_dir, "preview.png")
-
         width = PREVIEW_SIZE[0]
         height = PREVIEW_SIZE[1]
         _surface = pygame.transform.scale(self._screen, (width, height))
-        pygame.image.save(_surface, _file_path)
-
-        f = open(_file_path, "rb")
-        preview = f.read()
-        f.close()
-        os.remove(_file_path)
 
-        return preview
+        # Encode in memory rather than round-tripping through a file.
+        if hasattr(pygame.image, "tobytes"):
+            rgb = pygame.image.tobytes(_surface, "RGB")
+        else:
+            rgb = pygame.image.tostring(_surface, "RGB")
+        return encode_png(width, height, rgb)
@@ -103,11 +103,12 @@ class Translator(object):
         self.__keystate = [0] * 323
         self.__button_state = [0, 0, 0]
         self.__mouse_pos = (0, 0)
+        self.__motion_rel = [0, 0]
+        self.__motion_tick_id = None
         self.__repeat = (None, None)
         self.__held = set()
-        self.__held_time_left = {}
-        self.__held_last_time = {}
-        self.__tick_id = None
+        self.__held_deadline = {}
+        self.__repeat_id = None
 
     def hook_pygame(self):
         pygame.key.get_pressed = self._get_pressed
@@ -143,21 +144,18 @@ class Translator(object):
             return True
         else:
             if self.__repeat[0] is not None:
-                self.__held_last_time[key] = pygame.time.get_ticks()
-                self.__held_time_left[key] = self.__repeat[0]
+                self.__held_deadline[key] = \
+                    pygame.time.get_ticks() + self.__repeat[0]
+                self._schedule_repeat()
             self.__held.add(key)
 
         return self._keyevent(widget, event, pygame.KEYDOWN)
 
     def _keyup_cb(self, widget, event):
         key = event.keyval
-        if self.__repeat[0] is not None:
-            if key in self.__held:
-                # This is possibly false if set_repeat()
-                # is called with a key held
-                del self.__held_time_left[key]
-                del self.__held_last_time[key]
         self.__held.discard(key)
+        if self.__held_deadline.pop(key, None) is not None:
+            self._schedule_repeat()
 
         return self._keyevent(widget, event, pygame.KEYUP)
 
@@ -215,6 +213,8 @@ class Translator(object):
         return self._mouseevent(widget, event, pygame.MOUSEBUTTONUP)
 
     def _mouseevent(self, widget, event, type):
+        # Keep the pending motion ahead of the button event it led to.
+        self._flush_motion()
         evt = pygame.event.Event(type, button=event.button, pos=(event.x,
                                                                  event.y))
         self._post(evt)
@@ -231,40 +231,77 @@ class Translator(object):
             y = event.y
             state = event.get_state()
 
-        rel = (x - self.__mouse_pos[0], y - self.__mouse_pos[1])
+        self.__motion_rel[0] += x - self.__mouse_pos[0]
+        self.__motion_rel[1] += y - self.__mouse_pos[1]
         self.__mouse_pos = (x, y)
 
-        self.__button_state = [
-            state & Gdk.ModifierType.BUTTON1_MASK and 1 or 0,
-            state & Gdk.ModifierType.BUTTON2_MASK and 1 or 0,
-            state & Gdk.ModifierType.BUTTON3_MASK and 1 or 0,
-        ]
+        button_state = self.__button_state
+        button_state[0] = state & Gdk.ModifierType.BUTTON1_MASK and 1 or 0
+        button_state[1] = state & Gdk.ModifierType.BUTTON2_MASK and 1 or 0
+        button_state[2] = state & Gdk.ModifierType.BUTTON3_MASK and 1 or 0
+
+        # Coalesce: post at most one MOUSEMOTION per frame, carrying the
+        # latest position and the motion accumulated since the last one.
+        if self.__motion_tick_id is None:
+            self.__motion_tick_id = self._inner_evb.add_tick_callback(
+                self._motion_tick_cb)
+        return True
+
+    def _motion_tick_cb(self, widget, frame_clock):
+        self.__motion_tick_id = None
+        self._flush_motion()
+        return False
+
+    def _flush_motion(self):
+        if self.__motion_tick_id is not None:
+            self._inner_evb.remove_tick_callback(self.__motion_tick_id)
+            self.__motion_tick_id = None
+
+        rel = self.__motion_rel
+        if rel[0] == 0 and rel[1] == 0:
+            return
 
         evt = pygame.event.Event(pygame.MOUSEMOTION,
-                                 pos=self.__mouse_pos, rel=rel,
-                                 buttons=self.__button_state)
+                                 pos=self.__mouse_pos, rel=(rel[0], rel[1]),
+                                 buttons=tuple(self.__button_state))
+        rel[0] = rel[1] = 0
         self._post(evt)
-        return True
 
-    def _tick_cb(self):
-        cur_time = pygame.time.get_ticks()
-        for key in self.__held:
-            delta = cur_time - self.__held_last_time[key]
-            self.__held_last_time[key] = cur_time
+    def _schedule_repeat(self):
+        # A single one-shot timer, armed for the earliest repeat deadline
+        # of the held keys; nothing runs while no key is held.
+        if self.__repeat_id is not None:
+            GLib.source_remove(self.__repeat_id)
+            self.__repeat_id = None
+
+        if self.__held_deadline:
+            next_deadline = min(self.__held_deadline.values())
+            delay = max(0, next_deadline - pygame.time.get_ticks())
+            self.__repeat_id = GLib.timeout_add(delay, self._repeat_cb)
 
-            self.__held_time_left[key] -= delta
-            if self.__held_time_left[key] <= 0:
-                self.__held_time_left[key] = self.__repeat[1]
+    def _repeat_cb(self):
+        self.__repeat_id = None
+        cur_time = pygame.time.get_ticks()
+        for key, deadline in list(self.__held_deadline.items()):
+            if deadline <= cur_time:
+                self.__held_deadline[key] = cur_time + self.__repeat[1]
                 self._keyevent(None, _MockEvent(key), pygame.KEYDOWN)
 
-        return True
+        self._schedule_repeat()
+        return False
 
     def _set_repeat(self, delay=None, interval=None):
-        if delay is not None and self.__repeat[0] is None:
-            self.__tick_id = GLib.timeout_add(10, self._tick_cb)
-        elif delay is None and self.__repeat[0] is not None:
-            GLib.source_remove(self.__tick_id)
-        self.__repeat = (delay, interval)
+        if not delay:
+            # Like pygame, no delay (or zero) turns repeating off.
+            self.__repeat = (None, None)
+            self.__held_deadline.clear()
+        else:
+            self.__repeat = (delay, interval or delay)
+            # Keys already held start repeating after the new delay.
+            cur_time = pygame.time.get_ticks()
+            for key in self.__held:
+                self.__held_deadline.setdefault(key, cur_time + delay)
+        self._schedule_repeat()
 
     def _get_mouse_pos(self):
         return self.__mouse_pos